@@ -1,12 +1,21 @@
 from helpers import read_input
+from typing import List
 
 
-def part1():
+def part1(lines: List[str]):
     pass
 
 
-def part2():
+def part2(lines: List[str]):
     pass
 
 
-lines = read_input(0, sample=True)
+def solve(part: int, sample: bool = False):
+    """Solve one part of the puzzle."""
+    lines = read_input(0, sample=sample)
+    return part1(lines) if part == 1 else part2(lines)
+
+
+if __name__ == "__main__":
+    print(solve(1, sample=True))
+    print(solve(2, sample=True))
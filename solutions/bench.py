@@ -0,0 +1,320 @@
+"""Benchmark the solutions, optionally comparing against a stored baseline.
+
+Usage: python bench.py [--repeat N] [--scaling] [--save [PATH]] [--compare [PATH]] [DAY ...]
+"""
+
+import argparse
+from collections import namedtuple
+from functools import partial
+from importlib import import_module
+import json
+from math import ceil
+import multiprocessing
+from pathlib import Path
+import resource
+from statistics import median
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+from helpers import Grid2D, Point, read_digit_grid, read_input, read_ints
+from run import discover_days, PARTS
+
+DEFAULT_BASELINE = Path(__file__).parent.parent / "bench_baseline.json"
+NOISE_FLOOR = 0.001  # seconds; differences below this are never regressions
+
+Stats = Dict[str, float]
+# Cases with memory set also record the peak memory of one extra run
+ScalingCase = namedtuple(
+    "ScalingCase", ("day", "label", "sizes", "setup", "memory"), defaults=(False,)
+)
+
+
+def scale_cave(factor: int) -> Callable[[], Any]:
+    """Expand a cave by a factor, and find the lowest risk path through it."""
+    day15 = import_module("day15")
+    cave = Grid2D.from_array(*read_digit_grid(15))
+    return lambda: day15.part1(day15.expand_cave(cave, factor))
+
+
+def scale_tiled_cave(factor: int) -> Callable[[], Any]:
+    """Search a cave tiled by a factor without materializing it."""
+    day15 = import_module("day15")
+    cave = day15.TiledCave(Grid2D.from_array(*read_digit_grid(15)), factor)
+    end = (cave.width - 1, cave.height - 1)
+    return lambda: day15.a_star(cave, (0, 0), end)
+
+
+def scale_lanternfish(days: int) -> Callable[[], Any]:
+    """Simulate the lanternfish population for a number of days."""
+    day6 = import_module("day6")
+    population = day6.count_population(read_ints(6))
+    return lambda: day6.simulate(population, days)
+
+
+def scale_lanternfish_horizons(days: int) -> Callable[[], Any]:
+    """Find the lanternfish population after every day up to a number of days, from a cold cache."""
+    day6 = import_module("day6")
+    population = day6.count_population(read_ints(6))
+
+    def run():
+        day6.DESCENDANTS = day6.Descendants()
+        return day6.simulate_many(population, range(days + 1))
+
+    return run
+
+
+def scale_vents(factor: int) -> Callable[[], Any]:
+    """Count the vent overlaps with every coordinate multiplied by a factor."""
+    day5 = import_module("day5")
+    vents = []
+    for line in read_input(5):
+        start, end = (
+            Point(*(int(n) * factor for n in end.split(",")))
+            for end in line.split(" -> ")
+        )
+        vents.append(day5.Vent(start, end))
+    return lambda: day5.part2(vents)
+
+
+def scale_report(lines: int) -> Callable[[], Any]:
+    """Rate the life support from a number of random 64-bit report lines."""
+    day3 = import_module("day3")
+    report = np.random.default_rng(3).integers(0, 256, (lines, 8), dtype=np.uint8)
+    return lambda: day3.part2(report, 64)
+
+
+def scale_boards(count: int) -> Callable[[], Any]:
+    """Find the last of a number of random bingo boards to win."""
+    day4 = import_module("day4")
+    rng = np.random.default_rng(4)
+    boards = [
+        day4.Board(rng.permutation(100)[:25].reshape(5, 5).tolist())
+        for _ in range(count)
+    ]
+    choices = rng.permutation(100).tolist()
+    return lambda: day4.part2(choices, boards)
+
+
+def scale_height_map(side: int) -> Callable[[], Any]:
+    """Find the low points and basins of a random square height map."""
+    day9 = import_module("day9")
+    heights = np.random.default_rng(9).integers(0, 10, (side, side), dtype=np.uint8)
+    height_map = np.pad(heights, 1, constant_values=day9.WALL)
+    return lambda: (day9.part1(height_map), day9.part2(height_map))
+
+
+def scale_display_log(copies: int) -> Callable[[], Any]:
+    """Decode a log of the displays repeated a number of times."""
+    day8 = import_module("day8")
+    data = "\n".join(read_input(8) * copies).encode()
+
+    def run():
+        masks = day8.to_masks(data).reshape(-1, day8.PATTERNS + day8.OUTPUTS)
+        return day8.part2(
+            day8.decode(masks[:, : day8.PATTERNS], masks[:, day8.PATTERNS :])
+        )
+
+    return run
+
+
+def scale_crabs(count: int) -> Callable[[], Any]:
+    """Align a number of crabs at random positions, for both fuel costs."""
+    day7 = import_module("day7")
+    positions = np.random.default_rng(7).integers(0, 2 * count, count)
+
+    def run():
+        crabs = day7.Crabs(positions)
+        return day7.part1(crabs), day7.part2(crabs)
+
+    return run
+
+
+def scale_polymer(steps: int) -> Callable[[], Any]:
+    """Apply the pair insertion rules for a number of steps."""
+    day14 = import_module("day14")
+    template, rules = day14.parse_polymer(read_input(14))
+    return lambda: day14.step_n(template, rules, steps)
+
+
+def scale_polymer_matrix(steps: int) -> Callable[[], Any]:
+    """Raise the compiled pair insertion rules to a number of steps, from a cold cache."""
+    day14 = import_module("day14")
+    template, rules = day14.parse_polymer(read_input(14))
+
+    def run():
+        day14.compile_rules.cache_clear()
+        return day14.step_n(template, rules, steps, matrix=True)
+
+    return run
+
+
+def scale_image(steps: int) -> Callable[[], Any]:
+    """Enhance the image for a number of steps, spreading its tiles across processes."""
+    day20 = import_module("day20")
+    lines = read_input(20)
+    algorithm, image = day20.parse_algorithm(lines[0]), day20.Image.from_lines(
+        lines[2:]
+    )
+    return lambda: day20.enhance_tiled(image, algorithm, steps).count_lit()
+
+
+SCALING_CASES = [
+    ScalingCase(15, "expand_cave", (1, 5, 10, 20), scale_cave, memory=True),
+    ScalingCase(15, "tiled_cave", (1, 5, 10, 20), scale_tiled_cave, memory=True),
+    ScalingCase(6, "days", (80, 256, 1024, 4096), scale_lanternfish),
+    ScalingCase(6, "horizons", (80, 256, 1024, 4096), scale_lanternfish_horizons),
+    ScalingCase(3, "report_lines", (1000, 10_000, 100_000, 1_000_000), scale_report),
+    ScalingCase(4, "boards", (100, 1000, 10_000, 100_000), scale_boards),
+    ScalingCase(5, "scaled_vents", (1, 10, 100, 1000), scale_vents),
+    ScalingCase(7, "crabs", (1000, 10_000, 100_000, 1_000_000), scale_crabs),
+    ScalingCase(8, "log_copies", (1, 50, 500, 5000), scale_display_log),
+    ScalingCase(9, "height_map", (100, 300, 1000, 3000), scale_height_map),
+    ScalingCase(14, "steps", (10, 40, 160, 640), scale_polymer),
+    ScalingCase(14, "matrix_steps", (10, 40, 160, 640), scale_polymer_matrix),
+    ScalingCase(20, "tiled_steps", (50, 200, 400), scale_image),
+]
+
+
+def time_runs(func: Callable[[], Any], repeat: int) -> List[float]:
+    """Time repeated calls to a function."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def peak_memory(func: Callable[[], Any]) -> float:
+    """
+    Measure how far one call to a function raises the peak memory, in MB.
+
+    The call runs in a forked process, so the peak is not masked by whatever
+    this process or earlier benchmarks have already used.
+    """
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+
+    def measure():
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        func()
+        sender.send(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+
+    process = context.Process(target=measure)
+    process.start()
+    growth = receiver.recv()
+    process.join()
+    return growth / 1024  # ru_maxrss is in KB
+
+
+def summarize(times: List[float]) -> Stats:
+    """Summarize timings as a median and a (nearest-rank) 95th percentile."""
+    ordered = sorted(times)
+    return {
+        "median": median(ordered),
+        "p95": ordered[ceil(0.95 * len(ordered)) - 1],
+        "runs": len(ordered),
+    }
+
+
+def bench_days(days: List[int], repeat: int) -> Dict[str, Stats]:
+    """Benchmark each part of each day."""
+    results = {}
+    for day in days:
+        module = import_module(f"day{day}")
+        if hasattr(module, "part1_2"):  # both parts are solved together
+            labels: List[Tuple[str, int]] = [("part1_2", 1)]
+        else:
+            labels = [(f"part{part}", part) for part in PARTS]
+        for label, part in labels:
+            name = f"day{day}.{label}"
+            times = time_runs(partial(module.solve, part), repeat)  # type: ignore
+            results[name] = summarize(times)
+            report(name, results[name])
+    return results
+
+
+def bench_scaling(days: List[int], repeat: int) -> Dict[str, Stats]:
+    """Benchmark each scaling case over its growing inputs, and the peak memory of some."""
+    results = {}
+    for case in SCALING_CASES:
+        if case.day not in days:
+            continue
+        for size in case.sizes:
+            name = f"day{case.day}.{case.label}={size}"
+            func = case.setup(size)
+            results[name] = summarize(time_runs(func, repeat))
+            if case.memory:
+                results[name]["peak_mb"] = peak_memory(func)
+            report(name, results[name])
+    return results
+
+
+def report(name: str, stats: Stats):
+    """Print the timings for a benchmark."""
+    line = f"{name:<28} median {stats['median']:9.4f}s  p95 {stats['p95']:9.4f}s"
+    if "peak_mb" in stats:
+        line += f"  peak {stats['peak_mb']:8.1f}MB"
+    print(line)
+
+
+def find_regressions(
+    results: Dict[str, Stats], baseline: Dict[str, Stats], threshold: float
+) -> List[str]:
+    """Find the benchmarks whose median regressed past a threshold."""
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["median"], stats["median"]
+        if after > before * (1 + threshold) and after - before > NOISE_FLOOR:
+            regressions.append(f"{name}: {before:.4f}s -> {after:.4f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("days", nargs="*", type=int, help="days to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark")
+    parser.add_argument(
+        "--scaling", action="store_true", help="also run the scaling benchmarks"
+    )
+    parser.add_argument(
+        "--save", nargs="?", const=DEFAULT_BASELINE, type=Path, help="save a baseline"
+    )
+    parser.add_argument(
+        "--compare",
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        type=Path,
+        help="compare against a baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed slowdown before failing (default: 0.2 = 20%%)",
+    )
+    args = parser.parse_args()
+
+    days = args.days or discover_days()
+    results = bench_days(days, args.repeat)
+    if args.scaling:
+        results.update(bench_scaling(days, args.repeat))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
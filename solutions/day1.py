@@ -16,7 +16,12 @@ def part2(measurements: List[int]) -> int:
     )
 
 
-measurements = list(map(int, read_input(1, sample=True)))
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    measurements = list(map(int, read_input(1, sample=sample)))
+    return part1(measurements) if part == 1 else part2(measurements)
 
-print(part1(measurements))
-print(part2(measurements))
+
+if __name__ == "__main__":
+    print(solve(1, sample=True))
+    print(solve(2, sample=True))
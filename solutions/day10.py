@@ -50,7 +50,17 @@ def part2(incomplete: List[str]) -> int:
     return scores[len(scores) // 2]
 
 
-lines = read_input(10)
-part1_score, incomplete = part1(lines)
-print(part1_score)
-print(part2(incomplete))
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    return solve_parts(sample=sample)[part - 1]
+
+
+def solve_parts(sample: bool = False) -> Tuple[int, int]:
+    """Solve both parts of the puzzle, as part 2 needs the incomplete lines from part 1."""
+    part1_score, incomplete = part1(read_input(10, sample=sample))
+    return part1_score, part2(incomplete)
+
+
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
@@ -1,82 +1,63 @@
-from helpers import Point, read_input
-from collections import deque
-from typing import Deque, List, Set, Tuple
+from helpers import Grid2D, read_digit_grid
+from typing import List
 
 
-WIDTH = HEIGHT = 10
-
-
-def adjacent_to(p: Point) -> Set[Point]:
-    """Returns the set of points cardinally or diagonally adjacent to a point."""
-    return set(
-        Point(ax, ay)
-        for ax, ay in [
-            (p.x - 1, p.y - 1),  # NW
-            (p.x - 1, p.y + 0),  # N
-            (p.x - 1, p.y + 1),  # NE
-            (p.x + 0, p.y - 1),  # W
-            (p.x + 0, p.y + 1),  # E
-            (p.x + 1, p.y - 1),  # SW
-            (p.x + 1, p.y + 0),  # S
-            (p.x + 1, p.y + 1),  # SE
-        ]
-        if 0 <= ay < HEIGHT and 0 <= ax < WIDTH
-    )
-
-
-def step(grid: List[List[int]]) -> Tuple[List[List[int]], int]:
-    """Advance the grid one step forwards, returning the number of flashes."""
-    new_grid = [row[:] for row in grid]
-    queue: Deque[Point] = deque()
+def step(grid: Grid2D) -> int:
+    """Advance the grid one step forwards in place, returning the number of flashes."""
+    cells = grid.cells
+    stack: List[int] = []
 
     # first pass: increment and mark initial flashing
-    for y in range(HEIGHT):
-        for x in range(WIDTH):
-            new_grid[y][x] += 1
-            if new_grid[y][x] > 9:
-                queue.append(Point(x, y))
-
-    # second pass: propagate flashes
-    flashed: Set[Point] = set()
-    while len(queue) > 0:
-        curr = queue.popleft()
-        if curr in flashed:
-            continue  # octopus can only flash once
-        flashed.add(curr)
-        for adj in adjacent_to(curr):
-            new_grid[adj.y][adj.x] += 1
-            if new_grid[adj.y][adj.x] > 9:
-                queue.append(adj)
-
-    # third pass: reset flashed to zero
-    for p in flashed:
-        new_grid[p.y][p.x] = 0
-
-    return new_grid, len(flashed)
-
-
-def part1(grid: List[List[int]]) -> int:
+    for i in grid.indices():
+        cells[i] += 1
+        if cells[i] == 10:
+            stack.append(i)
+
+    # second pass: propagate flashes (an octopus is only pushed once, at 10)
+    flashes = 0
+    while len(stack) > 0:
+        curr = stack.pop()
+        flashes += 1
+        for offset in grid.adjacent:
+            adj = curr + offset
+            cells[adj] += 1
+            if cells[adj] == 10:
+                stack.append(adj)
+
+    # third pass: reset flashed to zero, and clear increments to the padding
+    for i in grid.indices():
+        if cells[i] > 9:
+            cells[i] = 0
+    grid.repad()
+
+    return flashes
+
+
+def part1(grid: Grid2D) -> int:
     """How many total flashes are there after 100 steps?"""
     total_flashes = 0
-    new_grid = grid
+    new_grid = grid.copy()
     for _ in range(100):
-        new_grid, flashes = step(new_grid)
-        total_flashes += flashes
+        total_flashes += step(new_grid)
     return total_flashes
 
 
-def part2(grid: List[List[int]]) -> int:
+def part2(grid: Grid2D) -> int:
     """What is the first step during which all octopuses flash?"""
     i = 1
-    new_grid = grid
+    new_grid = grid.copy()
     while True:
-        new_grid, flashes = step(new_grid)
-        if flashes == WIDTH * HEIGHT:
+        if step(new_grid) == grid.width * grid.height:
             return i
         i += 1
 
 
-lines = read_input(11)
-grid = [list(map(int, list(line))) for line in lines]
-print(part1(grid))
-print(part2(grid))
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    grid = Grid2D.from_array(*read_digit_grid(11, sample=sample))
+    return part1(grid) if part == 1 else part2(grid)
+
+
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
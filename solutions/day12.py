@@ -50,12 +50,17 @@ def part2(graph: Graph) -> int:
     return len(paths)
 
 
-lines = read_input(12)
-graph = defaultdict(set)
-for line in lines:
-    src, dest = line.split("-")
-    graph[src].add(dest)
-    graph[dest].add(src)
-
-print(part1(graph))
-print(part2(graph))
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    lines = read_input(12, sample=sample)
+    graph: Graph = defaultdict(set)
+    for line in lines:
+        src, dest = line.split("-")
+        graph[src].add(dest)
+        graph[dest].add(src)
+    return part1(graph) if part == 1 else part2(graph)
+
+
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
@@ -1,37 +1,39 @@
-from helpers import read_input, Point
-from typing import List
+from helpers import read_input, Grid2D, Point
+from typing import List, Union
 
 
-Grid = List[List[bool]]
+def render_grid(grid: Grid2D) -> str:
+    """Render a grid as text."""
+    return "\n".join(
+        "".join("#" if cell else "." for cell in row) for row in grid.rows()
+    )
 
 
-def print_grid(grid: Grid):
-    """Print a grid."""
-    for row in grid:
-        print("".join("#" if cell else "." for cell in row))
-
-
-def fold_up(grid: Grid, line_y: int) -> Grid:
+def fold_up(grid: Grid2D, line_y: int) -> Grid2D:
     """Fold a grid upwards along a horizontal line."""
-    new_grid = [row[:] for row in grid]
-    width, height = len(grid[0]), len(grid)
-    for i in range(line_y):
-        for j in range(width):
-            new_grid[i][j] |= new_grid[height - i - 1][j]
-    return new_grid[:line_y]
+    folded = Grid2D(grid.width, line_y)
+    for y in range(line_y):
+        dest = folded.index(0, y)
+        top = grid.index(0, y)
+        bottom = grid.index(0, grid.height - y - 1)
+        for x in range(grid.width):
+            folded.cells[dest + x] = grid.cells[top + x] | grid.cells[bottom + x]
+    return folded
 
 
-def fold_left(grid: Grid, line_x: int) -> Grid:
+def fold_left(grid: Grid2D, line_x: int) -> Grid2D:
     """Fold a grid leftwards along a vertical line."""
-    new_grid = [row[:] for row in grid]
-    width, height = len(grid[0]), len(grid)
-    for j in range(line_x):
-        for i in range(height):
-            new_grid[i][j] |= new_grid[i][width - j - 1]
-    return [row[:line_x] for row in new_grid]
+    folded = Grid2D(line_x, grid.height)
+    for y in range(grid.height):
+        dest = folded.index(0, y)
+        left = grid.index(0, y)
+        right = grid.index(grid.width - 1, y)
+        for x in range(line_x):
+            folded.cells[dest + x] = grid.cells[left + x] | grid.cells[right - x]
+    return folded
 
 
-def apply_fold(grid: Grid, fold: str) -> Grid:
+def apply_fold(grid: Grid2D, fold: str) -> Grid2D:
     """Apply a fold to a grid."""
     d, n = fold.split("=")
     if d == "y":
@@ -42,12 +44,12 @@ def apply_fold(grid: Grid, fold: str) -> Grid:
         raise ValueError(fold)
 
 
-def part1(grid: Grid, folds: List[str]) -> int:
+def part1(grid: Grid2D, folds: List[str]) -> int:
     """How many dots are visible after completing just the first fold instruction on your transparent paper?"""
-    return sum(sum(row) for row in apply_fold(grid, folds[0]))
+    return sum(apply_fold(grid, folds[0]).cells)  # the padding is all zeroes
 
 
-def part2(grid: Grid, folds: List[str]) -> Grid:
+def part2(grid: Grid2D, folds: List[str]) -> Grid2D:
     """What code do you use to activate the infrared thermal imaging camera system?"""
     curr = grid
     for fold in folds:
@@ -55,15 +57,20 @@ def part2(grid: Grid, folds: List[str]) -> Grid:
     return curr
 
 
-lines = read_input(13)
-blank = lines.index("")
-dots = [Point(*map(int, line.split(","))) for line in lines[:blank]]
-folds = [line.strip("fold along ") for line in lines[blank + 1 :]]
-width = max(d.x for d in dots) + 1
-height = max(d.y for d in dots) + 1
-grid = [[False] * width for _ in range(height)]
-for d in dots:
-    grid[d.y][d.x] = True
+def solve(part: int, sample: bool = False) -> Union[int, str]:
+    """Solve one part of the puzzle."""
+    lines = read_input(13, sample=sample)
+    blank = lines.index("")
+    dots = [Point(*map(int, line.split(","))) for line in lines[:blank]]
+    folds = [line.strip("fold along ") for line in lines[blank + 1 :]]
+    width = max(d.x for d in dots) + 1
+    height = max(d.y for d in dots) + 1
+    grid = Grid2D(width, height)
+    for d in dots:
+        grid.cells[grid.index(d.x, d.y)] = 1
+    return part1(grid, folds) if part == 1 else render_grid(part2(grid, folds))
+
 
-print(part1(grid, folds))
-print_grid(part2(grid, folds))
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
@@ -1,10 +1,89 @@
 from helpers import read_input
 from collections import defaultdict
-from typing import Counter, DefaultDict, Dict, List, Tuple
+from functools import lru_cache
+import numpy as np
+from typing import Counter, DefaultDict, Dict, FrozenSet, List, Tuple
 
 
-def step_n(template: str, rules: Dict[str, str], n: int) -> int:
-    """Apply the rules for n steps."""
+def multiply(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Multiply non-negative integer arrays, using int64 unless the result could overflow."""
+    if a.size == 0 or b.size == 0:
+        return a @ b  # every entry of the result is an empty sum
+    if a.dtype != object and b.dtype != object:
+        # No entry of the result can exceed the largest of a times the largest column sum of b
+        bound = int(a.max()) * int(np.max(b.sum(axis=0, dtype=object)))
+        if bound < 2**63:
+            return a @ b
+    return a.astype(object) @ b.astype(object)
+
+
+class CompiledRules:
+    """
+    Represents insertion rules as an integer transition matrix over pairs.
+
+    Column i of the matrix holds the pairs produced in one step from pair i,
+    so n steps multiply the vector of pair counts by the matrix to the nth
+    power. The powers for each power of 2 are cached as they are squared, so
+    any n costs at most log2(n) matrix-vector products once they exist. The
+    counts stay in int64 until they could overflow, then become Python ints.
+    """
+
+    def __init__(self, rules: Dict[str, str]):
+        pairs = set(rules)
+        for pair, insertion in rules.items():
+            pairs.update((pair[0] + insertion, insertion + pair[1]))
+        self.pairs = sorted(pairs)
+        self.index = {pair: i for i, pair in enumerate(self.pairs)}
+        matrix = np.zeros((len(self.pairs), len(self.pairs)), dtype=np.int64)
+        for i, pair in enumerate(self.pairs):
+            if pair in rules:
+                insertion = rules[pair]
+                matrix[self.index[pair[0] + insertion], i] += 1
+                matrix[self.index[insertion + pair[1]], i] += 1
+            else:
+                matrix[i, i] = 1  # pairs without a rule are left alone
+        self.powers = [matrix]
+
+    def power(self, k: int) -> np.ndarray:
+        """Find the matrix raised to the power 2^k."""
+        while len(self.powers) <= k:
+            self.powers.append(multiply(self.powers[-1], self.powers[-1]))
+        return self.powers[k]
+
+    def elements_after(self, template: str, n: int) -> Counter[str]:
+        """Count the elements in a template after n steps."""
+        counts = np.zeros(len(self.pairs), dtype=np.int64)
+        # Pairs which no rule produces or consumes keep their count
+        elements: Counter[str] = Counter(template[-1])
+        for i in range(len(template) - 1):
+            pair = template[i : i + 2]
+            if pair in self.index:
+                counts[self.index[pair]] += 1
+            else:
+                elements[pair[0]] += 1
+        k = 0
+        while n >> k:
+            if (n >> k) & 1:
+                counts = multiply(self.power(k), counts)
+            k += 1
+        # Every element is the first of a pair, except the last, which never changes
+        for pair, count in zip(self.pairs, counts):
+            elements[pair[0]] += int(count)
+        return elements
+
+
+@lru_cache(maxsize=None)
+def compile_rules(rules: FrozenSet[Tuple[str, str]]) -> CompiledRules:
+    """Compile insertion rules, reusing the compiled rules (and their powers) for the same rules."""
+    return CompiledRules(dict(rules))
+
+
+def step_n(template: str, rules: Dict[str, str], n: int, matrix: bool = False) -> int:
+    """Apply the rules for n steps, optionally by raising their transition matrix to the nth power."""
+    if matrix:
+        elements = compile_rules(frozenset(rules.items())).elements_after(template, n)
+        present = [count for count in elements.values() if count > 0]
+        return max(present) - min(present)
     elements = Counter(template)
     bigrams: DefaultDict[str, int] = defaultdict(int)
     for i in range(len(template) - 1):
@@ -24,9 +103,29 @@ def step_n(template: str, rules: Dict[str, str], n: int) -> int:
     return counts[0][1] - counts[-1][1]
 
 
-lines = read_input(14)
-template = lines[0]
-rules = dict(line.split(" -> ") for line in lines[2:])  # type: ignore
+def part1(template: str, rules: Dict[str, str]) -> int:
+    """What do you get if you take the quantity of the most common element and subtract the quantity of the least common element [after 10 steps]?"""
+    return step_n(template, rules, 10)
+
+
+def part2(template: str, rules: Dict[str, str]) -> int:
+    """What do you get if you take the quantity of the most common element and subtract the quantity of the least common element [after 40 steps]?"""
+    return step_n(template, rules, 40)
+
+
+def parse_polymer(lines: List[str]) -> Tuple[str, Dict[str, str]]:
+    """Parse a polymer template and insertion rules from lines."""
+    template = lines[0]
+    rules = dict(line.split(" -> ") for line in lines[2:])  # type: ignore
+    return template, rules
+
+
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    template, rules = parse_polymer(read_input(14, sample=sample))
+    return part1(template, rules) if part == 1 else part2(template, rules)
+
 
-print(step_n(template, rules, 10))
-print(step_n(template, rules, 40))
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
@@ -1,71 +1,169 @@
-from typing import Dict, List, Optional, Set
-from helpers import Point, read_input
-from skimage.graph import route_through_array
+from array import array
+from typing import Dict, List, Optional, Tuple
+from helpers import Grid2D, read_digit_grid
 
+MAX_RISK = 9
+UNVISITED = 2**62
 
-def part1(cave: List[List[int]]) -> int:
-    """What is the lowest total risk of any path from the top left to the bottom right?"""
-    # Dijkstra's algorithm from: https://en.wikipedia.org/wiki/Dijkstra%27s_algorithm
-    height, width = len(cave), len(cave[0])
-    Q: Set[Point] = set()
-    dist: Dict[Point, int] = {}
-    prev: Dict[Point, Optional[Point]] = {}
-    for p in Point.range(width, height):
-        dist[p] = int(1e9)
-        prev[p] = None
-        Q.add(p)
-    dist[Point(0, 0)] = 0
-    while len(Q) > 0:
-        u = min(Q, key=lambda p: dist[p])
-        Q.remove(u)
-        for v in u.neighbours():
-            if v in Q:
-                alt = dist[u] + cave[v.y][v.x]
+
+def shortest_path(cave: Grid2D, start: int, end: int) -> Tuple[int, List[int]]:
+    """
+    Find the lowest total risk of any path between two cells, returning the risk and the path.
+
+    Uses Dial's algorithm: every risk is an integer from 1 to MAX_RISK, so the
+    distances waiting to be settled never span more than MAX_RISK + 1 values,
+    and a circular array of buckets can replace the priority queue.
+    """
+    cells = cave.cells
+    # The padding stays at -1, which no tentative distance can improve upon
+    dist = array("q", [-1]) * len(cells)
+    unvisited = array("q", [UNVISITED]) * cave.width
+    for y in range(cave.height):
+        row = cave.index(0, y)
+        dist[row : row + cave.width] = unvisited
+    prev = array("q", [-1]) * len(cells)
+
+    buckets: List[List[int]] = [[] for _ in range(MAX_RISK + 1)]
+    dist[start] = 0
+    buckets[0].append(start)
+    queued = 1
+    d = 0
+    while queued > 0:
+        bucket = buckets[d % len(buckets)]
+        while len(bucket) > 0:
+            u = bucket.pop()
+            queued -= 1
+            if dist[u] != d:
+                continue  # stale entry for a node which has since been improved
+            if u == end:
+                path = [u]
+                while path[-1] != start:
+                    path.append(prev[path[-1]])
+                return d, path[::-1]
+            for offset in cave.orthogonal:
+                v = u + offset
+                alt = d + cells[v]
                 if alt < dist[v]:
                     dist[v] = alt
                     prev[v] = u
-    return dist[Point(width - 1, height - 1)]
+                    buckets[alt % len(buckets)].append(v)
+                    queued += 1
+        d += 1
+    raise ValueError("no path")
 
 
-def expand_cave(cave: List[List[int]], factor: int) -> List[List[int]]:
+def part1(cave: Grid2D) -> int:
+    """What is the lowest total risk of any path from the top left to the bottom right?"""
+    risk, _ = shortest_path(
+        cave, cave.index(0, 0), cave.index(cave.width - 1, cave.height - 1)
+    )
+    return risk
+
+
+def expand_cave(cave: Grid2D, factor: int) -> Grid2D:
     """Expand a cave by a factor."""
-    height, width = len(cave), len(cave[0])
-    expanded_cave = [[0] * width * factor for _ in range(height * factor)]
+    height, width = cave.height, cave.width
+    expanded_cave = Grid2D(width * factor, height * factor)
     for tile_y in range(factor):
         for tile_x in range(factor):
             for y in range(height):
+                source = cave.index(0, y)
+                dest = expanded_cave.index(tile_x * width, tile_y * height + y)
                 for x in range(width):
-                    expanded_y = (tile_y * height) + y
-                    expanded_x = (tile_x * width) + x
-                    if tile_y == tile_x == 0:  # copy directly from cave
-                        source = cave[y][x]
-                    elif tile_y == 0:  # copy and increment from tile to left
-                        source_x = ((tile_x - 1) * width) + x
-                        source = expanded_cave[expanded_y][source_x] + 1
-                    else:  # copy and increment from tile above
-                        source_y = ((tile_y - 1) * height) + y
-                        source = expanded_cave[source_y][expanded_x] + 1
-                    expanded_cave[expanded_y][expanded_x] = (
-                        source - 9 if source > 9 else source
-                    )
+                    risk = cave.cells[source + x] + tile_y + tile_x
+                    expanded_cave.cells[dest + x] = (risk - 1) % 9 + 1
     return expanded_cave
 
 
-def part2(cave: List[List[int]]) -> int:
+class TiledCave:
+    """Represents a cave tiled by a factor, computing each risk on demand instead of storing it."""
+
+    def __init__(self, cave: Grid2D, factor: int):
+        self.cave = cave
+        self.width = cave.width * factor
+        self.height = cave.height * factor
+
+    def risk(self, x: int, y: int) -> int:
+        """Calculate the risk at (x,y)."""
+        tile_y, source_y = divmod(y, self.cave.height)
+        tile_x, source_x = divmod(x, self.cave.width)
+        risk = self.cave.cells[self.cave.index(source_x, source_y)] + tile_y + tile_x
+        return (risk - 1) % 9 + 1
+
+
+def a_star(
+    cave: TiledCave, start: Tuple[int, int], end: Tuple[int, int], path: bool = False
+) -> Tuple[int, Optional[List[Tuple[int, int]]]]:
+    """
+    Find the lowest total risk of any path between two points, returning the risk and optionally the path.
+
+    The Manhattan distance to the end is an admissible heuristic, because every
+    step costs at least 1. It is also consistent, so estimates only ever grow by
+    0 to MAX_RISK + 1 per step, and the same circular bucket queue as
+    shortest_path can order the search. Settled points cost one bit each, and
+    only the points on the frontier have a stored distance. The previous point
+    of each point is only stored if the path is wanted.
+    """
+    width, height = cave.width, cave.height
+    end_x, end_y = end
+    source = start[1] * width + start[0]
+    target = end_y * width + end_x
+    settled = bytearray((width * height + 7) >> 3)
+    frontier: Dict[int, int] = {source: 0}
+    prev: Dict[int, int] = {}
+    buckets: List[List[int]] = [[] for _ in range(MAX_RISK + 2)]
+    estimate = abs(end_x - start[0]) + abs(end_y - start[1])
+    buckets[estimate % len(buckets)].append(source)
+    queued = 1
+    while queued > 0:
+        bucket = buckets[estimate % len(buckets)]
+        while len(bucket) > 0:
+            u = bucket.pop()
+            queued -= 1
+            if (settled[u >> 3] >> (u & 7)) & 1:
+                continue  # stale entry for a point which was settled from a better one
+            y, x = divmod(u, width)
+            d = frontier[u]
+            if d + abs(end_x - x) + abs(end_y - y) != estimate:
+                continue  # stale entry for a point which has since been improved
+            del frontier[u]
+            settled[u >> 3] |= 1 << (u & 7)
+            if u == target:
+                if not path:
+                    return d, None
+                points = [u]
+                while points[-1] != source:
+                    points.append(prev[points[-1]])
+                return d, [(v % width, v // width) for v in reversed(points)]
+            for vx, vy in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if not (0 <= vx < width and 0 <= vy < height):
+                    continue
+                v = vy * width + vx
+                if (settled[v >> 3] >> (v & 7)) & 1:
+                    continue
+                alt = d + cave.risk(vx, vy)
+                if alt < frontier.get(v, UNVISITED):
+                    frontier[v] = alt
+                    if path:
+                        prev[v] = u
+                    alt_estimate = alt + abs(end_x - vx) + abs(end_y - vy)
+                    buckets[alt_estimate % len(buckets)].append(v)
+                    queued += 1
+        estimate += 1
+    raise ValueError("no path")
+
+
+def part2(cave: Grid2D) -> int:
     """What is the lowest total risk of any path from the top left to the bottom right?"""
     return part1(expand_cave(cave, 5))
 
 
-lines = read_input(15)
-cave = [[int(char) for char in line] for line in lines]
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    cave = Grid2D.from_array(*read_digit_grid(15, sample=sample))
+    return part1(cave) if part == 1 else part2(cave)
+
 
-print(part1(cave))
-# This is correct, but takes way too long:
-# print(part2(cave))
-# Luckily, scikit is magic!
-print(
-    route_through_array(
-        expand_cave(cave, 5), [0, 0], [499, 499], geometric=False, fully_connected=False
-    )[1]
-    - cave[0][0]
-)
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
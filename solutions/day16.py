@@ -1,178 +1,322 @@
-from collections import deque
+import argparse
 from dataclasses import dataclass
 import logging
 import operator
 from pythonjsonlogger import jsonlogger
 from math import prod
-from typing import Callable, Deque, Dict, Iterable, List, Sequence, Tuple
-from helpers import read_input
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+from helpers import input_path, Tracer
 
+logger = logging.getLogger(__name__)
+tracer = Tracer(logger)
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-formatter = jsonlogger.JsonFormatter()
-handler.setFormatter(formatter)
-logger.addHandler(handler)
 
+def configure_tracing(level: int, every: int = 1):
+    """Send decode traces to stderr as JSON."""
+    logger.setLevel(level)
+    handler = logging.StreamHandler()
+    formatter = jsonlogger.JsonFormatter()
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    tracer.enable(level, every)
+
+
+class BitReader:
+    """Reads bit fields from a transmission through a bit offset, without copying the transmission."""
+
+    def __init__(self, data: Union[bytes, bytearray]):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    @staticmethod
+    def from_file(f: BinaryIO, chunk_size: int = 1 << 16) -> "BitReader":
+        """Create a reader from a file of hexadecimal, which is decoded in chunks."""
+        data = bytearray()
+        carry = b""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            chunk = carry + chunk.strip()
+            cut = len(chunk) - len(chunk) % 2  # bytes.fromhex needs whole bytes
+            data += bytes.fromhex(chunk[:cut].decode())
+            carry = chunk[cut:]
+        if carry:
+            data += bytes.fromhex(carry.decode() + "0")
+        return BitReader(data)
+
+    def read(self, n: int) -> int:
+        """Read an n-bit unsigned integer, advancing the offset."""
+        end = self.offset + n
+        first, last = self.offset >> 3, (end + 7) >> 3
+        if last > len(self.data):
+            raise EOFError(
+                f"cannot read {n} bits at bit {self.offset} of {len(self.data) * 8}"
+            )
+        window = int.from_bytes(self.data[first:last], "big")
+        self.offset = end
+        return (window >> ((last << 3) - end)) & ((1 << n) - 1)
 
-@dataclass
-class Packet:
-    version: int
+
+REDUCERS: Dict[int, Callable[[Iterable[int]], int]] = {
+    0: sum,
+    1: prod,
+    2: min,
+    3: max,
+}
+COMPARATORS: Dict[int, Callable[[int, int], bool]] = {
+    5: operator.gt,
+    6: operator.lt,
+    7: operator.eq,
+}
 
 
 @dataclass
-class LiteralPacket(Packet):
-    literal: int
+class Program:
+    """Represents a packet tree compiled to postfix instructions."""
+
+    # The type ID of each packet, in postfix order
+    ops: List[int]
+    # The literal of each literal packet, or the sub-packet count of each operator packet
+    args: List[int]
+    version_sum: int
 
 
 @dataclass
-class OperatorPacket(Packet):
+class OpenOperator:
+    """Represents an operator packet whose sub-packets are still being decoded."""
+
     type_id: int
-    sub_packets: Sequence[Packet]
-
-
-def btoi(b: str) -> int:
-    """Convert a bitstring into an integer."""
-    return int(b, base=2)
-
-
-def decode_literal_packet(version: int, stream: str) -> Tuple[LiteralPacket, str]:
-    """Decode a literal packet, returning the packet and the remainder of the stream."""
-    logger.info("decoding literal packet", extra={"version": version, "stream": stream})
-    groups: List[str] = []
-    while len(stream) >= 5:
-        prefix, group, stream = stream[0], stream[1:5], stream[5:]
-        groups.append(group)
-        if prefix == "0":
-            break
-    literal = btoi("".join(groups))
-    packet = LiteralPacket(version, literal)
-    logger.info("decoded literal packet", extra={"packet": packet})
-    return packet, stream
-
-
-def decode_sub_packets_by_total_length(
-    total_length: int, stream: str
-) -> Tuple[Sequence[Packet], str]:
-    """Decode sub-packets with a total length, returning the sub-packets and the remainder of the stream."""
-    logger.info(
-        "decoding sub-packet by total length",
-        extra={"total_length": total_length, "stream": stream},
-    )
-    sub_packets: List[Packet] = []
-    length = 0
-    while length < total_length:
-        original_length = len(stream)
-        packet, stream = decode_packet(stream)
-        sub_packets.append(packet)
-        length += original_length - len(stream)
-    assert length == total_length
-    logger.info("decoded sub-packets by length", extra={"sub_packets": sub_packets})
-    return sub_packets, stream
-
-
-def decode_sub_packets_by_number(
-    number: int, stream: str
-) -> Tuple[Sequence[Packet], str]:
-    """Decode a fixed number of sub-packets, returning the sub-packets and the remainder of the stream."""
-    logger.info(
-        "decoding sub-packets by number", extra={"number": number, "stream": stream}
-    )
-    sub_packets: List[Packet] = []
-    for _ in range(number):
-        packet, stream = decode_packet(stream)
-        sub_packets.append(packet)
-    logger.info("decoded sub-packets by number", extra={"sub_packets": sub_packets})
-    return sub_packets, stream
-
-
-def decode_operator_packet(
-    version: int, type_id: int, stream: str
-) -> Tuple[OperatorPacket, str]:
-    """Decode an operator packet, returning the packet and the remainder of the stream."""
-    logger.info(
-        "decoding operator packet",
-        extra={"version": version, "type_id": type_id, "stream": stream},
-    )
-    length_type_id, stream = stream[0], stream[1:]
-    if length_type_id == "0":
-        total_length, stream = btoi(stream[:15]), stream[15:]
-        sub_packets, stream = decode_sub_packets_by_total_length(total_length, stream)
-    elif length_type_id == "1":
-        number, stream = btoi(stream[:11]), stream[11:]
-        sub_packets, stream = decode_sub_packets_by_number(number, stream)
-    else:
-        raise ValueError(length_type_id)
-    packet = OperatorPacket(version, type_id, sub_packets)
-    logger.info("decoded operator packet", extra={"packet": packet})
-    return packet, stream
-
-
-def decode_packet(stream: str) -> Tuple[Packet, str]:
-    """Decode a packet, returning the packet and the remainder of the stream."""
-    logger.info("decoding packet", extra={"stream": stream})
-    header, stream = stream[:6], stream[6:]
-    version = btoi(header[:3])
-    type_id = btoi(header[3:6])
-    if type_id == 4:
-        return decode_literal_packet(version, stream)
-    else:
-        return decode_operator_packet(version, type_id, stream)
+    # The offset where the sub-packets end, if they are given by total length
+    end: Optional[int]
+    # The number of sub-packets still to decode, if they are given by number
+    remaining: Optional[int]
+    count: int = 0
 
+    def is_complete(self, offset: int) -> bool:
+        """Check whether every sub-packet has been decoded."""
+        if self.end is not None:
+            assert offset <= self.end
+            return offset == self.end
+        return self.remaining == 0
 
-def part1(packet: Packet) -> int:
-    """What do you get if you add up the version numbers in all packets?"""
+
+def decode_literal(reader: BitReader) -> int:
+    """Decode the groups of a literal packet."""
+    literal = 0
+    while True:
+        prefix = reader.read(1)
+        literal = (literal << 4) | reader.read(4)
+        if prefix == 0:
+            return literal
+
+
+def decode_operator(type_id: int, reader: BitReader) -> OpenOperator:
+    """Decode the length fields of an operator packet."""
+    if reader.read(1) == 0:
+        total_length = reader.read(15)
+        if tracer.enabled:
+            tracer.emit(
+                logging.INFO,
+                "decoding sub-packets by total length",
+                lambda: {"total_length": total_length, "offset": reader.offset},
+            )
+        return OpenOperator(type_id, reader.offset + total_length, None)
+    number = reader.read(11)
+    if tracer.enabled:
+        tracer.emit(
+            logging.INFO,
+            "decoding sub-packets by number",
+            lambda: {"number": number, "offset": reader.offset},
+        )
+    return OpenOperator(type_id, None, number)
+
+
+def decode_program(reader: BitReader) -> Program:
+    """
+    Decode a transmission straight to postfix instructions, summing the versions along the way.
+
+    Operator packets whose sub-packets are still being decoded are kept on an
+    explicit stack, so the depth of nesting is limited only by memory. An
+    operator is emitted once its last sub-packet is, which is postfix order.
+    """
+    ops: List[int] = []
+    args: List[int] = []
     version_sum = 0
-    queue: Deque[Packet] = deque([packet])
-    while len(queue) > 0:
-        packet = queue.popleft()
-        version_sum += packet.version
-        if isinstance(packet, OperatorPacket):
-            queue.extend(packet.sub_packets)
-    return version_sum
-
-
-def evaluate_operator_packet(packet: OperatorPacket) -> int:
-    """Evaluate the expression associated with an operator packet."""
-    functions: Dict[int, Callable[[Iterable[int]], int]] = {
-        0: sum,
-        1: prod,
-        2: min,
-        3: max,
-    }
-    operators: Dict[int, Callable[[int, int], bool]] = {
-        5: operator.gt,
-        6: operator.lt,
-        7: operator.eq,
-    }
-    if 0 <= packet.type_id <= 3:
-        return functions[packet.type_id](evaluate_packet(p) for p in packet.sub_packets)
-    elif 4 <= packet.type_id <= 7:
-        assert len(packet.sub_packets) == 2
-        a, b = packet.sub_packets
-        return int(operators[packet.type_id](evaluate_packet(a), evaluate_packet(b)))
-    else:
-        raise ValueError(packet.type_id)
+    stack: List[OpenOperator] = []
+    while True:
+        if tracer.enabled:
+            tracer.emit(
+                logging.DEBUG, "decoding packet", lambda: {"offset": reader.offset}
+            )
+        version = reader.read(3)
+        type_id = reader.read(3)
+        version_sum += version
+        if type_id == 4:
+            literal = decode_literal(reader)
+            ops.append(4)
+            args.append(literal)
+            if tracer.enabled:
+                tracer.emit(
+                    logging.DEBUG,
+                    "decoded literal packet",
+                    lambda: {"literal": literal, "offset": reader.offset},
+                )
+            completed = True
+        else:
+            stack.append(decode_operator(type_id, reader))
+            completed = False
+        # Close every operator which the last packet completed, innermost first
+        while len(stack) > 0 and (completed or stack[-1].is_complete(reader.offset)):
+            top = stack[-1]
+            if completed:
+                top.count += 1
+                if top.remaining is not None:
+                    top.remaining -= 1
+            if not top.is_complete(reader.offset):
+                break
+            stack.pop()
+            ops.append(top.type_id)
+            args.append(top.count)
+            if tracer.enabled:
+                tracer.emit(
+                    logging.INFO,
+                    "decoded sub-packets by "
+                    + ("number" if top.end is None else "total length"),
+                    lambda: {"number": top.count, "offset": reader.offset},
+                )
+            completed = True
+        if len(stack) == 0 and completed:
+            return Program(ops, args, version_sum)
 
 
-def evaluate_packet(packet: Packet) -> int:
-    """Evaluate the expression associated with a packet."""
-    if isinstance(packet, LiteralPacket):
-        return packet.literal
-    elif isinstance(packet, OperatorPacket):
-        return evaluate_operator_packet(packet)
-    else:
-        raise ValueError(packet)
+def evaluate(program: Program) -> int:
+    """Evaluate a compiled program with an explicit stack."""
+    stack: List[int] = []
+    for op, arg in zip(program.ops, program.args):
+        if op == 4:
+            stack.append(arg)
+            continue
+        split = len(stack) - arg
+        operands = stack[split:]
+        del stack[split:]
+        if op in REDUCERS:
+            stack.append(REDUCERS[op](operands))
+        elif op in COMPARATORS:
+            assert len(operands) == 2
+            stack.append(int(COMPARATORS[op](*operands)))
+        else:
+            raise ValueError(op)
+    assert len(stack) == 1
+    return stack[0]
 
 
-def part2(packet: Packet) -> int:
+def evaluate_batch(f: TextIO) -> Iterator[Tuple[int, int]]:
+    """Evaluate a file of transmissions, one per line, yielding each version sum and value."""
+    for line in f:
+        line = line.strip()
+        if line:
+            program = decode_program(BitReader(bytes.fromhex(line)))
+            yield program.version_sum, evaluate(program)
+
+
+def part1(program: Program) -> int:
+    """What do you get if you add up the version numbers in all packets?"""
+    return program.version_sum
+
+
+def part2(program: Program) -> int:
     """What do you get if you evaluate the expression represented by your hexadecimal-encoded BITS transmission?"""
-    return evaluate_packet(packet)
+    return evaluate(program)
+
+
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    with open(input_path(16, sample=sample), "rb") as f:
+        program = decode_program(BitReader.from_file(f))
+    return part1(program) if part == 1 else part2(program)
+
+
+def nested_sums(depth: int, literal: int) -> bytes:
+    """Encode a literal inside a number of nested one-sub-packet sum operators."""
+    bits = "001" + "000" + "1" + format(1, "011b")
+    bits = bits * depth + "110" + "100" + "0" + format(literal, "04b")
+    bits += "0" * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, "big")
+
+
+def test_decode():
+    data = [
+        ("8A004A801A8002F478", 16, 15),
+        ("620080001611562C8802118E34", 12, 46),
+        ("C0015000016115A2E0802F182340", 23, 46),
+        ("C200B40A82", 14, 3),
+        ("9C0141080250320F1802104A08", 20, 1),
+    ]
+    for transmission, version_sum, value in data:
+        program = decode_program(BitReader(bytes.fromhex(transmission)))
+        assert program.version_sum == version_sum
+        assert evaluate(program) == value
+
 
+def test_deep_nesting():
+    for depth in (500, 1200, 5000):
+        program = decode_program(BitReader(nested_sums(depth, 7)))
+        assert program.ops == [4] + [0] * depth
+        assert program.version_sum == depth + 6
+        assert evaluate(program) == 7
 
-lines = read_input(16)
-stream = bin(int(lines[0], base=16))[2:].zfill(len(lines[0] * 4))
-packet, remainder = decode_packet(stream)
-print(part1(packet))
-print(part2(packet))
+
+def test_truncated():
+    reader = BitReader(bytes.fromhex("D2FE28"))
+    assert reader.read(21) == 0b110100101111111000101
+    try:
+        reader.read(4)
+    except EOFError:
+        pass
+    else:
+        raise AssertionError("read past the end of the transmission")
+    try:
+        decode_program(BitReader(bytes.fromhex("38006F45291200")[:4]))
+    except EOFError:
+        pass
+    else:
+        raise AssertionError("decoded a truncated transmission")
+
+
+test_decode()
+test_deep_nesting()
+test_truncated()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--trace", choices=["DEBUG", "INFO"], help="log decode traces as JSON"
+    )
+    parser.add_argument(
+        "--trace-every", type=int, default=1, help="only log every nth trace"
+    )
+    parser.add_argument(
+        "--batch", type=argparse.FileType(), help="evaluate a file of transmissions"
+    )
+    args = parser.parse_args()
+    if args.trace:
+        configure_tracing(getattr(logging, args.trace), args.trace_every)
+    if args.batch:
+        for version_sum, value in evaluate_batch(args.batch):
+            print(version_sum, value)
+    else:
+        print(solve(1))
+        print(solve(2))
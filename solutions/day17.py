@@ -1,67 +1,194 @@
+from bisect import bisect_left, bisect_right
 from collections import namedtuple
+from math import isqrt
 import re
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from helpers import read_input
 
-
 Region = namedtuple("Region", ("x1", "x2", "y1", "y2"))
 
+# The steps at which the probe is inside the target along one axis, from first to last
+# inclusive; a last step of None means the probe stays inside forever
+Steps = Tuple[int, Optional[int]]
 
-def apply_drag(dx: int) -> int:
-    """Apply drag to a horizontal velocity."""
-    if dx > 0:
-        return dx - 1
-    elif dx < 0:
-        return dx + 1
-    else:
-        return dx
+
+def position(v: int, t: int) -> int:
+    """Find the distance travelled after t steps, starting at velocity v and slowing by 1 each step."""
+    return t * v - t * (t - 1) // 2
+
+
+def first_step_reaching(v: int, p: int) -> Optional[int]:
+    """Find the first step at which a velocity v slowing to a stop has travelled p, or None if it never does."""
+    if p <= 0:
+        return 0
+    if position(v, v) < p:
+        return None
+    # Smaller root of t^2 - (2v+1)t + 2p = 0, then corrected for rounding
+    b = 2 * v + 1
+    t = (b - isqrt(b * b - 8 * p)) // 2
+    while t > 0 and position(v, t - 1) >= p:
+        t -= 1
+    while position(v, t) < p:
+        t += 1
+    return t
+
+
+def last_step_above(v: int, p: int) -> int:
+    """Find the last step at which a falling velocity v is still at or above p, for p <= 0."""
+    # Larger root of t^2 - (2v+1)t + 2p = 0, then corrected for rounding
+    b = 2 * v + 1
+    t = (b + isqrt(b * b - 8 * p)) // 2
+    while position(v, t + 1) >= p:
+        t += 1
+    while position(v, t) < p:
+        t -= 1
+    return t
+
+
+def min_speed(distance: int) -> int:
+    """Find the smallest horizontal speed which travels a distance before drag stops it."""
+    if distance <= 0:
+        return 0
+    a = (isqrt(8 * distance + 1) - 1) // 2
+    return a if a * (a + 1) // 2 >= distance else a + 1
+
+
+def x_steps(target: Region) -> List[Steps]:
+    """Find the steps at which each horizontal velocity is inside the target."""
+    steps: List[Steps] = []
+    if target.x1 <= 0 <= target.x2:
+        steps.append((1, None))  # a velocity of 0 never leaves
+    # Moving left is moving right towards the mirrored target
+    for near, far in ((target.x1, target.x2), (-target.x2, -target.x1)):
+        if far <= 0:
+            continue
+        for a in range(max(min_speed(near), 1), far + 1):
+            first = first_step_reaching(a, near)
+            beyond = first_step_reaching(a, far + 1)
+            # If it never passes the far edge, drag stops it inside the target
+            last = None if beyond is None else beyond - 1
+            assert first is not None, "min_speed reaches the near edge"
+            first = max(first, 1)
+            if last is None or first <= last:
+                steps.append((first, last))
+    return steps
 
 
-def step(x: int, y: int, dx: int, dy: int) -> Tuple[int, int, int, int]:
-    """Advance the simulation by one step."""
-    return x + dx, y + dy, apply_drag(dx), dy - 1
+def y_steps(target: Region) -> List[Tuple[int, int, int]]:
+    """Find the steps at which each vertical velocity is inside the target, as (velocity, first, last)."""
+    if target.y2 >= 0:
+        raise ValueError("the target must be below the launch point")
+    steps = []
+    # Any faster downwards overshoots on the first step; any faster upwards comes back
+    # down through y=0 moving faster than the target is deep, and overshoots it
+    for dy in range(target.y1, -target.y1):
+        first = last_step_above(dy, target.y2 + 1) + 1
+        last = last_step_above(dy, target.y1)
+        if first <= last:
+            steps.append((dy, first, last))
+    return steps
 
 
-def simulate(target: Region, dx: int, dy: int) -> Optional[int]:
-    """Simulate the probe, returning the best y position or None if the probe misses."""
-    best_y = 0
-    x, y = 0, 0
-    while True:
-        if x > target.x2:
-            return None  # overshot
-        if y < target.y1:
-            return None  # undershot
-        if target.x1 <= x <= target.x2 and target.y1 <= y <= target.y2:
-            return best_y
-        x, y, dx, dy = step(x, y, dx, dy)
-        best_y = max(y, best_y)
+def hits(target: Region) -> List[Tuple[int, int]]:
+    """
+    Find each vertical velocity which hits the target, with the number of horizontal velocities it pairs with.
+
+    A pair hits the target if its step ranges overlap. Each horizontal range
+    either ends before the vertical one starts, starts after it ends, or
+    overlaps it, so the overlaps are counted by bisecting the sorted ends.
+    """
+    xs = x_steps(target)
+    firsts = sorted(first for first, _ in xs)
+    lasts = sorted(last for _, last in xs if last is not None)
+    result = []
+    for dy, first, last in y_steps(target):
+        before = bisect_left(lasts, first)
+        after = len(firsts) - bisect_right(firsts, last)
+        count = len(xs) - before - after
+        if count > 0:
+            result.append((dy, count))
+    return result
+
+
+def settling_step(target: Region) -> Optional[int]:
+    """Find the first step at which a horizontal velocity which drag stops inside the target is inside it, or None if none stops inside."""
+    if target.x1 <= 0 <= target.x2:
+        return 1
+    # Moving left is moving right towards the mirrored target
+    near, far = (target.x1, target.x2) if target.x1 > 0 else (-target.x2, -target.x1)
+    # The fastest speed which stops before passing the far edge reaches the near edge first
+    a = (isqrt(8 * far + 1) - 1) // 2
+    if a * (a + 1) // 2 < near:
+        return None
+    first = first_step_reaching(a, near)
+    assert first is not None, "a speed which stops past the near edge reaches it"
+    return max(first, 1)
 
 
 def part1(target: Region) -> int:
     """What is the highest y position it reaches on this trajectory?"""
-    best_y = 0
-    for dx in range(500):
-        for dy in range(-500, 500):
-            result = simulate(target, dx, dy)
-            if result is not None:
-                best_y = max(best_y, result)
-    return best_y
+    if target.y2 >= 0:
+        raise ValueError("the target must be below the launch point")
+    # A probe launched upwards at dy comes back down through y=0 at dy + 1, so the
+    # fastest which can hit is -y1 - 1, which reaches y1 at step -2 * y1. It needs a
+    # horizontal velocity which drag stops inside the target by then
+    settled = settling_step(target)
+    if settled is not None and settled <= -2 * target.y1:
+        dy = -target.y1 - 1
+    else:
+        dy = max((dy for dy, _ in hits(target)), default=0)
+    # The probe rises dy + (dy-1) + ... + 1 before falling
+    return dy * (dy + 1) // 2 if dy > 0 else 0
 
 
 def part2(target: Region) -> int:
     """How many distinct initial velocity values cause the probe to be within the target area after any step?"""
-    solutions = 0
-    for dx in range(1000):
-        for dy in range(-1000, 1000):
-            result = simulate(target, dx, dy)
-            if result is not None:
-                solutions += 1
-    return solutions
+    return sum(count for _, count in hits(target))
+
+
+def simulate(target: Region) -> Tuple[int, int]:
+    """Find the highest y of any hit, and the number of velocities which hit, by flying every probe."""
+    highest, count = 0, 0
+    for vx in range(min(target.x1, 0), max(target.x2, 0) + 1):
+        for vy in range(target.y1, -target.y1 + 1):
+            x, y, dx, dy, top = 0, 0, vx, vy, 0
+            while y >= target.y1:
+                x, y = x + dx, y + dy
+                dx, dy = dx - (dx > 0) + (dx < 0), dy - 1
+                top = max(top, y)
+                if target.x1 <= x <= target.x2 and target.y1 <= y <= target.y2:
+                    highest, count = max(highest, top), count + 1
+                    break
+    return highest, count
+
+
+def test_velocities():
+    data = [
+        # The example, where a horizontal velocity stops inside the target
+        Region(20, 30, -10, -5),
+        # No triangular number lies in 11..14, so no horizontal velocity stops inside
+        Region(11, 14, -10, -5),
+        # A target straddling x=0, and one to the left
+        Region(-3, 4, -7, -2),
+        Region(-30, -20, -10, -5),
+        # A target so shallow that the highest launch passes it before any probe stops in it
+        Region(40, 45, -3, -1),
+    ]
+    for target in data:
+        assert (part1(target), part2(target)) == simulate(target), target
+
+
+test_velocities()
+
 
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    lines = read_input(17, sample=sample)
+    pattern = r"^target area: x=(-?\d+)\.\.(-?\d+), y=(-?\d+)\.\.(-?\d+)$"
+    target = Region(*[int(g) for g in re.match(pattern, lines[0]).groups()])  # type: ignore
+    return part1(target) if part == 1 else part2(target)
 
-lines = read_input(17)
-pattern = r"^target area: x=(-?\d+)\.\.(-?\d+), y=(-?\d+)\.\.(-?\d+)$"
-target = Region(*[int(g) for g in re.match(pattern, lines[0]).groups()])  # type: ignore
 
-print(part1(target))
-print(part2(target))
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
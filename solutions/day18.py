@@ -1,9 +1,12 @@
 from ast import literal_eval
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from dataclasses import dataclass
 from helpers import read_input
-from math import ceil, floor
-from typing import Iterator, Optional, Tuple, Union
+from itertools import product, repeat
+from math import ceil, floor, prod
+import os
+from typing import Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
 
 
 @dataclass
@@ -174,6 +177,131 @@ class SFN:
         return isinstance(other, SFN) and id(self) == id(other)
 
 
+@dataclass
+class FlatSFN:
+    """
+    Represents a snailfish number as parallel lists of leaf values and depths.
+
+    Leaves are stored left to right, and the depth of a leaf is the number of
+    pairs it is nested inside. The two leaves of an exploding pair are always
+    adjacent, so reduction is a scan over indices rather than a tree walk.
+    """
+
+    values: List[int]
+    depths: List[int]
+
+    @staticmethod
+    def from_nested_list(a: list) -> "FlatSFN":
+        """Create a snailfish number from a nested list."""
+        values: List[int] = []
+        depths: List[int] = []
+        stack: List[Tuple[Union[list, int], int]] = [(a, 0)]
+        while len(stack) > 0:
+            item, depth = stack.pop()
+            if isinstance(item, list):
+                assert len(item) == 2
+                stack.append((item[1], depth + 1))
+                stack.append((item[0], depth + 1))
+            else:
+                values.append(item)
+                depths.append(depth)
+        return FlatSFN(values, depths)
+
+    def to_nested_list(self) -> list:
+        """Convert a snailfish number to a nested list."""
+        # Pairs are rebuilt whenever the top two items on the stack are siblings
+        stack: List[Tuple[Union[list, int], int]] = []
+        for value, depth in zip(self.values, self.depths):
+            stack.append((value, depth))
+            while len(stack) > 1 and stack[-1][1] == stack[-2][1]:
+                (right, depth), (left, _) = stack.pop(), stack.pop()
+                stack.append(([left, right], depth - 1))
+        assert len(stack) == 1
+        return stack[0][0]  # type: ignore
+
+    def explode_at(self, i: int):
+        """Explode the pair whose left value is at index i."""
+        values, depths = self.values, self.depths
+        if i > 0:
+            values[i - 1] += values[i]
+        if i + 2 < len(values):
+            values[i + 2] += values[i + 1]
+        values[i : i + 2] = [0]
+        depths[i : i + 2] = [depths[i] - 1]
+
+    def split_at(self, i: int):
+        """Split the value at index i."""
+        value, depth = self.values[i], self.depths[i] + 1
+        self.values[i : i + 1] = [floor(value / 2), ceil(value / 2)]
+        self.depths[i : i + 1] = [depth, depth]
+
+    def explode(self) -> Tuple["FlatSFN", bool]:
+        """
+        Try to explode a snailfish number.
+
+        Returns the (possibly mutated) snailfish number and whether the explosion succeeded.
+        """
+        for i, depth in enumerate(self.depths):
+            if depth > 4:
+                self.explode_at(i)
+                return self, True
+        return self, False
+
+    def split(self) -> Tuple["FlatSFN", bool]:
+        """
+        Try to split a snailfish number.
+
+        Returns the (possibly mutated) snailfish number and whether the split succeeded.
+        """
+        for i, value in enumerate(self.values):
+            if value >= 10:
+                self.split_at(i)
+                return self, True
+        return self, False
+
+    def reduce(self) -> "FlatSFN":
+        """
+        Reduce a snailfish number by repeatedly exploding and splitting.
+
+        Returns the (possibly mutated) snailfish number
+        """
+        # Explosions never create deeper pairs, so one scan explodes every pair
+        i = 0
+        while i < len(self.values):
+            if self.depths[i] > 4:
+                self.explode_at(i)
+            i += 1
+        # A split can create at most one explosive pair, which explodes at once.
+        # Only the values at and left of the split can change, so the scan
+        # steps back by at most one.
+        i = 0
+        while i < len(self.values):
+            if self.values[i] < 10:
+                i += 1
+                continue
+            self.split_at(i)
+            if self.depths[i] > 4:
+                self.explode_at(i)
+                i = max(i - 1, 0)
+        return self
+
+    def magnitude(self) -> int:
+        """Calculate the magnitude of a snailfish number."""
+        stack: List[Tuple[int, int]] = []
+        for value, depth in zip(self.values, self.depths):
+            stack.append((value, depth))
+            while len(stack) > 1 and stack[-1][1] == stack[-2][1]:
+                (right, depth), (left, _) = stack.pop(), stack.pop()
+                stack.append((3 * left + 2 * right, depth - 1))
+        return stack[0][0]
+
+    def __add__(self, other: "FlatSFN") -> "FlatSFN":
+        sfn = FlatSFN(
+            self.values + other.values, [d + 1 for d in self.depths + other.depths]
+        )
+        return sfn.reduce()
+
+
 def test_explode():
     data = [
         ([[[[[9, 8], 1], 2], 3], 4], [[[[0, 9], 2], 3], 4]),
@@ -200,9 +328,10 @@ def test_explode():
             [[[[0, 7], 4], [[7, 8], [6, 0]]], [8, 1]],
         ),
     ]
-    for input, expected in data:
-        output, did_explode = SFN.from_nested_list(input).explode()
-        assert did_explode and output.to_nested_list() == expected
+    for cls in (SFN, FlatSFN):
+        for input, expected in data:
+            output, did_explode = cls.from_nested_list(input).explode()
+            assert did_explode and output.to_nested_list() == expected
 
 
 def test_split():
@@ -216,9 +345,10 @@ def test_split():
             [[[[0, 7], 4], [[7, 8], [0, [6, 7]]]], [1, 1]],
         ),
     ]
-    for input, expected in data:
-        output, did_split = SFN.from_nested_list(input).split()
-        assert did_split and output.to_nested_list() == expected
+    for cls in (SFN, FlatSFN):
+        for input, expected in data:
+            output, did_split = cls.from_nested_list(input).split()
+            assert did_split and output.to_nested_list() == expected
 
 
 def test_add():
@@ -229,9 +359,10 @@ def test_add():
             [[[[0, 7], 4], [[7, 8], [6, 0]]], [8, 1]],
         )
     ]
-    for a, b, expected in data:
-        output = SFN.from_nested_list(a) + SFN.from_nested_list(b)
-        assert output.to_nested_list() == expected
+    for cls in (SFN, FlatSFN):
+        for a, b, expected in data:
+            output = cls.from_nested_list(a) + cls.from_nested_list(b)
+            assert output.to_nested_list() == expected
 
 
 test_explode()
@@ -239,7 +370,11 @@ test_split()
 test_add()
 
 
-def part1(sfns: list[SFN]) -> int:
+# Either representation of a snailfish number, but the same one throughout a sum
+SnailfishNumber = TypeVar("SnailfishNumber", SFN, FlatSFN)
+
+
+def part1(sfns: Sequence[SnailfishNumber]) -> int:
     """What is the magnitude of the final sum?"""
     curr = sfns[0]
     for sfn in sfns[1:]:
@@ -247,19 +382,80 @@ def part1(sfns: list[SFN]) -> int:
     return curr.magnitude()
 
 
-def part2(sfns: list[SFN]) -> int:
-    """What is the largest magnitude of any sum of two different snailfish numbers from the homework assignment?"""
+# The magnitude weights of the leaves of a snailfish number with every leaf at depth 4
+LEAF_WEIGHTS = sorted((prod(path) for path in product((3, 2), repeat=4)), reverse=True)
+
+
+def magnitude_bound(leaf_sum: int) -> int:
+    """
+    Find an upper bound on the magnitude of a reduced snailfish number with at most a leaf sum.
+
+    Splits keep the leaf sum and explosions can only lose value off the ends, so
+    a sum never has a larger leaf sum than its operands combined. A reduced
+    number has no leaf deeper than 4 or larger than 9, so its magnitude is at
+    most that of spending the leaf sum, 9 at a time, on the heaviest leaves.
+    """
+    bound = 0
+    for weight in LEAF_WEIGHTS:
+        value = min(9, leaf_sum)
+        bound += weight * value
+        leaf_sum -= value
+    return bound
+
+
+def best_in_rows(sfns: List[FlatSFN], bounds: List[int], rows: range) -> int:
+    """
+    Find the largest magnitude of any sum whose left operand is in some rows.
+
+    The snailfish numbers must be sorted by descending leaf sum, so the bounds
+    only shrink along each row and down the rows, and the search can stop as
+    soon as a bound fails to beat the best magnitude found so far.
+    """
+    sums = [sum(sfn.values) for sfn in sfns]
     best = 0
-    for a in sfns:
-        for b in sfns:
-            if a != b:
-                best = max(best, (a + b).magnitude())
-                best = max(best, (b + a).magnitude())
+    for i in rows:
+        if len(sfns) > 1 and bounds[sums[i] + sums[1 if i == 0 else 0]] <= best:
+            break  # no later row can beat the best
+        for j in range(len(sfns)):
+            if i == j:
+                continue
+            if bounds[sums[i] + sums[j]] <= best:
+                break  # no later column can beat the best
+            best = max(best, (sfns[i] + sfns[j]).magnitude())
     return best
 
 
-lines = read_input(18)
-sfns = [SFN.from_nested_list(literal_eval(line)) for line in lines]
+def max_pair_magnitude(sfns: List[FlatSFN], workers: Optional[int] = None) -> int:
+    """
+    Find the largest magnitude of any sum of two different snailfish numbers.
+
+    Each ordered pair is considered once. Rows of pairs are shared out between
+    worker processes, which each prune pairs that cannot beat their best.
+    """
+    if len(sfns) < 2:
+        return 0  # there is no pair
+    ordered = sorted(sfns, key=lambda sfn: sum(sfn.values), reverse=True)
+    bounds = [magnitude_bound(s) for s in range(2 * sum(ordered[0].values) + 1)]
+    workers = min(workers or os.cpu_count() or 1, len(ordered))
+    if workers == 1:
+        return best_in_rows(ordered, bounds, range(len(ordered)))
+    shards = [range(k, len(ordered), workers) for k in range(workers)]
+    with ProcessPoolExecutor(workers) as executor:
+        return max(executor.map(best_in_rows, repeat(ordered), repeat(bounds), shards))
+
+
+def part2(sfns: List[FlatSFN]) -> int:
+    """What is the largest magnitude of any sum of two different snailfish numbers from the homework assignment?"""
+    return max_pair_magnitude(sfns)
+
+
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    lines = read_input(18, sample=sample)
+    sfns = [FlatSFN.from_nested_list(literal_eval(line)) for line in lines]
+    return part1(sfns) if part == 1 else part2(sfns)
+
 
-print(part1(sfns))
-print(part2(sfns))
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
@@ -1,6 +1,14 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from itertools import combinations
+import os
+from typing import Counter as CounterType, Iterator, Optional, Tuple
 from helpers import read_input
+import numpy as np
+
+# Twelve common beacons share this many pairwise distances
+MIN_SHARED_DISTANCES = 12 * 11 // 2
 
 
 @dataclass(eq=True, frozen=True)
@@ -20,6 +28,12 @@ class Beacon:
     def __sub__(self, other: "Beacon") -> "Beacon":
         return Beacon(self.x - other.x, self.y - other.y, self.z - other.z)
 
+    def squared_distance_to(self, other: "Beacon") -> int:
+        """Calculate the squared Euclidean distance to another beacon."""
+        return (
+            (self.x - other.x) ** 2 + (self.y - other.y) ** 2 + (self.z - other.z) ** 2
+        )
+
     def manhattan_distance_to(self, other: "Beacon") -> int:
         """Calculate the Manhattan distance to another beacon."""
         return abs(self.x - other.x) + abs(self.y - other.y) + abs(self.z - other.z)
@@ -65,6 +79,12 @@ class Scanner:
             for i in range(24)
         ]
 
+    def fingerprint(self) -> CounterType[int]:
+        """Count the squared distances between pairs of beacons, which no rotation or translation changes."""
+        return Counter(
+            a.squared_distance_to(b) for a, b in combinations(self.beacons, 2)
+        )
+
     def align(self, other: "Scanner") -> Optional["Scanner"]:
         """Attempt to align two scanners, returning a composite scanner."""
         reference = frozenset(self.beacons)
@@ -82,16 +102,157 @@ class Scanner:
         return None
 
 
-def part1_2(scanners: list[Scanner]) -> Tuple[int, int]:
+def shared_distances(a: CounterType[int], b: CounterType[int]) -> int:
+    """Count the distances two fingerprints have in common."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(min(count, b[distance]) for distance, count in a.items())
+
+
+def rank_candidates(
+    composite_fingerprint: CounterType[int], fingerprints: list[CounterType[int]]
+) -> Iterator[int]:
+    """
+    Generate the indices of candidates, most promising first.
+
+    Candidates which can't share 12 beacons with the composite in any
+    orientation are never generated.
+    """
+    ranked = sorted(
+        (
+            (shared_distances(fingerprint, composite_fingerprint), i)
+            for i, fingerprint in enumerate(fingerprints)
+        ),
+        reverse=True,
+    )
+    for shared, i in ranked:
+        if shared < MIN_SHARED_DISTANCES:
+            break
+        yield i
+
+
+def assemble(scanners: list[Scanner]) -> Scanner:
+    """Align every scanner into one composite scanner."""
     composite = scanners[0]
+    composite_fingerprint = composite.fingerprint()
     unused = scanners[1:]
+    fingerprints = [s.fingerprint() for s in unused]
     while len(unused) > 0:
-        for candidate in unused:
-            aligned = composite.align(candidate)
+        for i in rank_candidates(composite_fingerprint, fingerprints):
+            aligned = composite.align(unused[i])
             if aligned:
                 composite = aligned
-                unused.remove(candidate)
+                composite_fingerprint = composite.fingerprint()
+                del unused[i], fingerprints[i]
                 break
+        else:  # nobreak
+            raise ValueError("no remaining scanner aligns with the composite")
+    return composite
+
+
+def build_rotations() -> np.ndarray:
+    """Build the 24 rotation matrices, in the same order as Beacon.all_orientations."""
+    # Row k of each matrix is the image of the kth axis, so v @ m rotates v
+    axes = [Beacon(1, 0, 0), Beacon(0, 1, 0), Beacon(0, 0, 1)]
+    images = zip(*(axis.all_orientations() for axis in axes))
+    return np.array([[[b.x, b.y, b.z] for b in image] for image in images])
+
+
+ROTATIONS = build_rotations()
+# Candidate positions are packed into one integer per vote, 16 bits per axis
+AXIS_BITS = 16
+
+
+def array_fingerprint(beacons: np.ndarray) -> CounterType[int]:
+    """Count the squared distances between pairs of beacons in an array."""
+    i, j = np.triu_indices(len(beacons), k=1)
+    return Counter(((beacons[i] - beacons[j]) ** 2).sum(axis=1).tolist())
+
+
+def find_transform(
+    reference: np.ndarray, candidate: np.ndarray
+) -> Optional[Tuple[int, np.ndarray]]:
+    """
+    Attempt to align an (n, 3) array of beacons with a reference array.
+
+    Each pairing of a reference beacon with a rotated candidate beacon votes for
+    the position of the candidate scanner which would make them coincide, and a
+    position with 12 votes aligns the scanners. Returns the index of the
+    candidate's rotation and its position relative to the reference.
+    """
+    rotated = candidate @ ROTATIONS  # (24, n, 3)
+    positions = reference[None, :, None, :] - rotated[:, None, :, :]  # (24, m, n, 3)
+    biased = positions + (1 << (AXIS_BITS - 1))
+    votes = (
+        (np.arange(len(ROTATIONS))[:, None, None] << (3 * AXIS_BITS))
+        | (biased[..., 0] << (2 * AXIS_BITS))
+        | (biased[..., 1] << AXIS_BITS)
+        | biased[..., 2]
+    )
+    keys, counts = np.unique(votes, return_counts=True)
+    best = counts.argmax()
+    if counts[best] < 12:
+        return None
+    r, i, j = np.unravel_index(np.argmax(votes == keys[best]), votes.shape)
+    return int(r), positions[r, i, j]
+
+
+def assemble_graph(
+    scanners: list[Scanner], workers: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Align every scanner, returning the unique beacons and the scanner positions.
+
+    Scanners are aligned pairwise rather than against a growing composite, and
+    placed by a breadth-first search from scanner 0 which composes the relative
+    transforms. Each level of the search checks every pair of a newly placed
+    and an unplaced scanner at once, spread across worker processes. A scanner
+    is only expanded when it is placed, so no pair is ever checked twice.
+    """
+    arrays = [np.array([[b.x, b.y, b.z] for b in s.beacons]) for s in scanners]
+    fingerprints = [array_fingerprint(a) for a in arrays]
+    # Maps scanner indices to the rotation and position which take them to scanner 0
+    placed = {0: (np.eye(3, dtype=arrays[0].dtype), np.zeros(3, arrays[0].dtype))}
+    frontier = [0]
+    with ProcessPoolExecutor(workers or os.cpu_count()) as executor:
+        while len(frontier) > 0 and len(placed) < len(arrays):
+            pairs = [
+                (i, j)
+                for i in frontier
+                for j in range(len(arrays))
+                if j not in placed
+                and shared_distances(fingerprints[i], fingerprints[j])
+                >= MIN_SHARED_DISTANCES
+            ]
+            transforms = executor.map(
+                find_transform,
+                [arrays[i] for i, _ in pairs],
+                [arrays[j] for _, j in pairs],
+            )
+            frontier = []
+            for (i, j), transform in zip(pairs, transforms):
+                if transform is None or j in placed:
+                    continue
+                r, position = transform
+                rotation, offset = placed[i]
+                placed[j] = (ROTATIONS[r] @ rotation, position @ rotation + offset)
+                frontier.append(j)
+    if len(placed) < len(arrays):
+        raise ValueError("some scanners don't align with scanner 0")
+    beacons = np.vstack([arrays[j] @ r + p for j, (r, p) in placed.items()])
+    positions = np.array([p for _, p in placed.values()])
+    return np.unique(beacons, axis=0), positions
+
+
+def part1_2(
+    scanners: list[Scanner], vectorized: bool = True, workers: Optional[int] = None
+) -> Tuple[int, int]:
+    """How many beacons are there? What is the largest Manhattan distance between any two scanners?"""
+    if vectorized:
+        beacons, positions = assemble_graph(scanners, workers)
+        distances = np.abs(positions[:, None, :] - positions[None, :, :]).sum(axis=2)
+        return len(beacons), int(distances.max())
+    composite = assemble(scanners)
     largest_distance = 0
     for c in composite.centers:
         for d in composite.centers:
@@ -99,17 +260,30 @@ def part1_2(scanners: list[Scanner]) -> Tuple[int, int]:
     return len(composite.beacons), largest_distance
 
 
-lines = read_input(19)
-scanners: list[Scanner] = []
-chunk: list[str] = []
-for line in [*lines, ""]:
-    if len(line) == 0:
-        name = chunk[0].strip("-").strip()
-        beacons = [Beacon(*map(int, b.split(","))) for b in chunk[1:]]
-        scanners.append(Scanner(name, beacons))
-        chunk = []
-    else:
-        chunk.append(line)
+def parse_scanners(lines: list[str]) -> list[Scanner]:
+    """Parse scanners from lines."""
+    scanners: list[Scanner] = []
+    chunk: list[str] = []
+    for line in [*lines, ""]:
+        if len(line) == 0:
+            name = chunk[0].strip("-").strip()
+            beacons = [Beacon(*map(int, b.split(","))) for b in chunk[1:]]
+            scanners.append(Scanner(name, beacons))
+            chunk = []
+        else:
+            chunk.append(line)
+    return scanners
+
+
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    return solve_parts(sample=sample)[part - 1]
+
+
+def solve_parts(sample: bool = False) -> Tuple[int, int]:
+    """Solve both parts of the puzzle, which share all of their work."""
+    return part1_2(parse_scanners(read_input(19, sample=sample)))
 
 
-print(part1_2(scanners))
+if __name__ == "__main__":
+    print(part1_2(parse_scanners(read_input(19))))
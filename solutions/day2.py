@@ -33,7 +33,12 @@ def part2(lines: List[str]) -> int:
     return position * depth
 
 
-lines = read_input(2)
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    lines = read_input(2, sample=sample)
+    return part1(lines) if part == 1 else part2(lines)
 
-print(part1(lines))
-print(part2(lines))
+
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
@@ -1,109 +1,372 @@
-from collections import defaultdict
-from copy import deepcopy
-from typing import DefaultDict, Tuple
 from helpers import read_input
+from itertools import cycle
+import multiprocessing
+from multiprocessing.connection import Connection
+import numpy as np
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
 
 
-BUFFER = 25
+def parse_algorithm(line: str) -> np.ndarray:
+    """Parse an algorithm into a 512-entry lookup table."""
+    return np.array([char == "#" for char in line], dtype=np.uint8)
+
+
+def enhance_window(window: np.ndarray, algorithm: np.ndarray) -> np.ndarray:
+    """Apply an algorithm to the pixels of a window which have all of their neighbours inside it."""
+    height, width = window.shape[0] - 2, window.shape[1] - 2
+    lookup = np.zeros((height, width), dtype=np.uint16)
+    for dy in range(3):
+        for dx in range(3):
+            lookup = (lookup << 1) | window[dy : dy + height, dx : dx + width]
+    return algorithm[lookup]
 
 
 class Image:
-    def __init__(self, pixels: DefaultDict[Tuple[int, int], int]):
-        """Create an image from pixels."""
+    def __init__(self, pixels: np.ndarray, background: int = 0):
+        """
+        Create an image from a dense array of pixels.
+
+        Every pixel outside of the array, out to infinity, has the background value.
+        """
         self.pixels = pixels
+        self.background = background
 
     @staticmethod
     def from_lines(lines: list[str]) -> "Image":
         """Create an image from lines."""
-        # Down/right are positive, up/left are negative
-        pixels = defaultdict(int)
-        for y, line in enumerate(lines):
-            for x, char in enumerate(line):
-                pixels[(y, x)] = 1 if char == "#" else 0
-        return Image(pixels)
-
-    def corners(self) -> Tuple[int, int, int, int]:
-        """Find the corners of an image."""
-        top = left = bottom = right = 0
-        for (y, x), pixel in self.pixels.items():
-            if pixel == 1:
-                top = min(top, y)
-                bottom = max(bottom, y)
-                left = min(left, x)
-                right = max(right, x)
-        return top, bottom, left, right
+        return Image(
+            np.array([[char == "#" for char in line] for line in lines], dtype=np.uint8)
+        )
 
     def display(self):
-        top, bottom, left, right = self.corners()
-        for y in range(top, bottom + 1):
-            line = []
-            for x in range(left, right + 1):
-                line.append("#" if self.pixels[(y, x)] == 1 else ".")
-            print("".join(line))
+        for row in self.pixels:
+            print("".join("#" if pixel else "." for pixel in row))
         print()
 
-    def apply(self, algorithm: str) -> "Image":
+    def apply(self, algorithm: np.ndarray) -> "Image":
         """Apply an algorithm to an image."""
-        output = deepcopy(self.pixels)
-        top, bottom, left, right = self.corners()
-        for y in range(top - BUFFER, bottom + BUFFER + 1):
-            for x in range(left - BUFFER, right + BUFFER + 1):
-                neighborhood = [
-                    self.pixels[(y, x)]
-                    for y, x in [
-                        (y - 1, x - 1),
-                        (y - 1, x),
-                        (y - 1, x + 1),
-                        (y, x - 1),
-                        (y, x),
-                        (y, x + 1),
-                        (y + 1, x - 1),
-                        (y + 1, x),
-                        (y + 1, x + 1),
-                    ]
+        # Pixels within 1 of the array see some of it; pixels beyond see only background
+        padded = np.pad(self.pixels, 2, constant_values=self.background)
+        # A background of 0s looks up entry 0, and a background of 1s looks up entry 511
+        background = int(algorithm[511 if self.background else 0])
+        return Image(enhance_window(padded, algorithm), background)
+
+    def count_lit(self) -> int:
+        """Count the number of lit pixels."""
+        if self.background:
+            raise ValueError("infinitely many pixels are lit")
+        return int(self.pixels.sum())
+
+
+# Maps a neighbouring tile's direction to the edge it shares, and where that goes in a halo window
+HALO_SLICES = {
+    -1: (slice(-1, None), slice(0, 1)),
+    0: (slice(None), slice(1, -1)),
+    1: (slice(0, 1), slice(-1, None)),
+}
+
+# The edges of a tile, and the one-pixel ring around a tile, as (top, bottom, left, right) strips
+TOP, BOTTOM, LEFT, RIGHT = range(4)
+Strips = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+TileKey = Tuple[int, int]
+
+
+def enhance_tile(
+    window: np.ndarray, algorithm: np.ndarray, background: int, blank: bool = False
+) -> Optional[np.ndarray]:
+    """
+    Enhance the tile inside a halo window, returning None if it is all background.
+
+    A blank tile holds only the old background, so its inner pixels all become
+    the new background, and only its outermost pixels need the halo.
+    """
+    if not blank:
+        tile = enhance_window(window, algorithm)
+    else:
+        tile = np.full((window.shape[0] - 2, window.shape[1] - 2), background, np.uint8)
+        tile[0] = enhance_window(window[:3], algorithm)[0]
+        tile[-1] = enhance_window(window[-3:], algorithm)[0]
+        tile[:, 0] = enhance_window(window[:, :3], algorithm)[:, 0]
+        tile[:, -1] = enhance_window(window[:, -3:], algorithm)[:, 0]
+    return None if (tile == background).all() else tile
+
+
+def is_background(strips: Iterable[np.ndarray], background: int) -> bool:
+    """Check whether strips of pixels hold only background."""
+    return all((strip == background).all() for strip in strips)
+
+
+def tile_edges(tile: np.ndarray) -> Strips:
+    """Find the edges of a tile, which are all its neighbours need of it."""
+    return tile[0], tile[-1], tile[:, 0], tile[:, -1]
+
+
+def halo_window(
+    tile: Optional[np.ndarray], halo: Strips, tile_size: int, background: int
+) -> np.ndarray:
+    """Surround a tile, or a tile of background, with its halo."""
+    window = np.empty((tile_size + 2, tile_size + 2), dtype=np.uint8)
+    window[0], window[-1], window[1:-1, 0], window[1:-1, -1] = halo
+    window[1:-1, 1:-1] = background if tile is None else tile
+    return window
+
+
+def tile_worker(connection: Connection, algorithm: np.ndarray, tile_size: int):
+    """
+    Keep a share of the tiles of an image, enhancing them as halos arrive.
+
+    Each step sends the halo of every tile this worker enhances, and the worker
+    answers with the edges of the tiles it now stores, so tiles never leave it
+    until they are gathered.
+    """
+    tiles: Dict[TileKey, np.ndarray] = {}
+    while True:
+        command, payload = connection.recv()
+        if command == "load":
+            tiles = payload
+            connection.send({key: tile_edges(tile) for key, tile in tiles.items()})
+        elif command == "step":
+            background, halos = payload
+            new_background = int(algorithm[511 if background else 0])
+            enhanced = {}
+            for key, halo in halos.items():
+                window = halo_window(tiles.get(key), halo, tile_size, background)
+                blank = key not in tiles
+                tile = enhance_tile(window, algorithm, new_background, blank)
+                if tile is not None:
+                    enhanced[key] = tile
+            tiles = enhanced
+            connection.send({key: tile_edges(tile) for key, tile in tiles.items()})
+        elif command == "gather":
+            connection.send(tiles)
+        elif command == "stop":
+            return
+
+
+class TiledImage:
+    """
+    Represents an image as square tiles, keyed by their (row, column) position.
+
+    Tiles which are entirely background are not stored, so memory tracks the lit
+    region rather than its bounding box. Each step enhances every tile within
+    one tile of a stored tile, from a window holding the tile plus a one-pixel
+    halo copied from the edges of its neighbours.
+    """
+
+    def __init__(
+        self, tiles: Dict[TileKey, np.ndarray], tile_size: int, background: int
+    ):
+        self.tiles = tiles
+        self.tile_size = tile_size
+        self.background = background
+
+    @staticmethod
+    def from_image(image: Image, tile_size: int = 1024) -> "TiledImage":
+        """Split an image into tiles, centred so it spreads into new tiles as late as possible."""
+        height, width = image.pixels.shape
+        pad_y, pad_x = -height % tile_size, -width % tile_size
+        padded = np.pad(
+            image.pixels,
+            ((pad_y // 2, pad_y - pad_y // 2), (pad_x // 2, pad_x - pad_x // 2)),
+            constant_values=image.background,
+        )
+        tiles = {}
+        for ty in range(padded.shape[0] // tile_size):
+            for tx in range(padded.shape[1] // tile_size):
+                tile = padded[
+                    ty * tile_size : (ty + 1) * tile_size,
+                    tx * tile_size : (tx + 1) * tile_size,
                 ]
-                lookup = int("".join(map(str, neighborhood)), base=2)
-                assert 0 <= lookup <= 512
-                output[(y, x)] = 1 if algorithm[lookup] == "#" else 0
-        return Image(output)
-
-    def trim(self) -> "Image":
-        top, bottom, left, right = self.corners()
-        output = defaultdict(int)
-        for (y, x), pixel in self.pixels.items():
-            if (
-                top + BUFFER < y < bottom - BUFFER
-                and left + BUFFER < x < right - BUFFER
-            ):
-                output[(y, x)] = pixel
-        return Image(output)
+                if not (tile == image.background).all():
+                    tiles[(ty, tx)] = tile.copy()
+        return TiledImage(tiles, tile_size, image.background)
+
+    def window(self, ty: int, tx: int) -> np.ndarray:
+        """Build the halo window around a tile."""
+        size = self.tile_size + 2
+        window = np.full((size, size), self.background, dtype=np.uint8)
+        for dy, (source_y, dest_y) in HALO_SLICES.items():
+            for dx, (source_x, dest_x) in HALO_SLICES.items():
+                tile = self.tiles.get((ty + dy, tx + dx))
+                if tile is not None:
+                    window[dest_y, dest_x] = tile[source_y, source_x]
+        return window
+
+    def apply(self, algorithm: np.ndarray) -> "TiledImage":
+        """Apply an algorithm to an image."""
+        background = int(algorithm[511 if self.background else 0])
+        tiles = {}
+        for ty, tx in neighbourhood(self.tiles):
+            window = self.window(ty, tx)
+            blank = (ty, tx) not in self.tiles
+            ring = (window[0], window[-1], window[:, 0], window[:, -1])
+            if blank and is_background(ring, self.background):
+                continue  # it stays blank
+            tile = enhance_tile(window, algorithm, background, blank)
+            if tile is not None:
+                tiles[(ty, tx)] = tile
+        return TiledImage(tiles, self.tile_size, background)
 
     def count_lit(self) -> int:
         """Count the number of lit pixels."""
-        return sum(self.pixels.values())
+        if self.background:
+            raise ValueError("infinitely many pixels are lit")
+        return int(sum(tile.sum(dtype=np.int64) for tile in self.tiles.values()))
 
 
-def part1(image: Image, algorithm: str) -> int:
-    """How many pixels are lit in the resulting image?"""
+def neighbourhood(keys: Iterable[TileKey]) -> List[TileKey]:
+    """Find every tile within one tile of the given tiles, which are the tiles a step can light."""
+    return sorted(
+        {
+            (ty + dy, tx + dx)
+            for ty, tx in keys
+            for dy in (-1, 0, 1)
+            for dx in (-1, 0, 1)
+        }
+    )
+
+
+class TileCluster:
+    """
+    Spreads the tiles of an image across persistent worker processes.
+
+    Each tile lives in the worker which owns its position, from the step it is
+    first lit until it is gathered. Only edges travel between steps: workers
+    report the edges of their tiles, and are sent back the halo strips the
+    next step needs, so each step moves the tiles' perimeters, not their areas.
+    """
+
+    def __init__(
+        self, image: TiledImage, algorithm: np.ndarray, workers: Optional[int] = None
+    ):
+        self.tile_size = image.tile_size
+        self.background = image.background
+        self.algorithm = algorithm
+        self.connections: List[Connection] = []
+        self.processes: List[multiprocessing.Process] = []
+        for _ in range(workers or os.cpu_count() or 1):
+            connection, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=tile_worker, args=(child, algorithm, self.tile_size), daemon=True
+            )
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+        # New positions are handed to the workers in turn
+        self.turn = cycle(range(len(self.connections)))
+        self.owners: Dict[TileKey, int] = {}
+        shares: List[Dict[TileKey, np.ndarray]] = [{} for _ in self.connections]
+        for key, tile in image.tiles.items():
+            shares[self.owner(key)][key] = tile
+        for connection, share in zip(self.connections, shares):
+            connection.send(("load", share))
+        self.edges = self.receive_edges()
+
+    def __enter__(self) -> "TileCluster":
+        return self
+
+    def __exit__(self, *exc):
+        for connection in self.connections:
+            connection.send(("stop", None))
+        for process in self.processes:
+            process.join()
+
+    def owner(self, key: TileKey) -> int:
+        """Find the worker which owns a tile position, handing it one if it has none."""
+        if key not in self.owners:
+            self.owners[key] = next(self.turn)
+        return self.owners[key]
+
+    def receive_edges(self) -> Dict[TileKey, Strips]:
+        """Collect the edges of every stored tile from the workers."""
+        edges = {}
+        for connection in self.connections:
+            edges.update(connection.recv())
+        # Positions which went dark are handed out afresh if they are lit again
+        self.owners = {key: self.owners[key] for key in edges}
+        return edges
+
+    def halo(self, ty: int, tx: int) -> Strips:
+        """Build the one-pixel ring around a tile from the edges of its neighbours."""
+        fill = np.full(self.tile_size, self.background, dtype=np.uint8)
+
+        def edge(dy: int, dx: int, side: int) -> np.ndarray:
+            edges = self.edges.get((ty + dy, tx + dx))
+            return fill if edges is None else edges[side]
+
+        top = np.concatenate(
+            (edge(-1, -1, BOTTOM)[-1:], edge(-1, 0, BOTTOM), edge(-1, 1, BOTTOM)[:1])
+        )
+        bottom = np.concatenate(
+            (edge(1, -1, TOP)[-1:], edge(1, 0, TOP), edge(1, 1, TOP)[:1])
+        )
+        return top, bottom, edge(0, -1, RIGHT), edge(0, 1, LEFT)
+
+    def apply(self):
+        """Apply the algorithm to the image, one step on every worker at once."""
+        halos: List[Dict[TileKey, Strips]] = [{} for _ in self.connections]
+        for ty, tx in neighbourhood(self.edges):
+            halo = self.halo(ty, tx)
+            if (ty, tx) in self.edges or not is_background(halo, self.background):
+                halos[self.owner((ty, tx))][(ty, tx)] = halo
+        for connection, share in zip(self.connections, halos):
+            connection.send(("step", (self.background, share)))
+        self.background = int(self.algorithm[511 if self.background else 0])
+        self.edges = self.receive_edges()
+
+    def gather(self) -> TiledImage:
+        """Collect the tiles from the workers into one image."""
+        tiles = {}
+        for connection in self.connections:
+            connection.send(("gather", None))
+        for connection in self.connections:
+            tiles.update(connection.recv())
+        return TiledImage(tiles, self.tile_size, self.background)
+
+
+def enhance_tiled(
+    image: Image,
+    algorithm: np.ndarray,
+    steps: int,
+    tile_size: int = 1024,
+    workers: Optional[int] = None,
+) -> TiledImage:
+    """Apply an algorithm to an image a number of times, keeping its tiles in worker processes."""
+    with TileCluster(
+        TiledImage.from_image(image, tile_size), algorithm, workers
+    ) as cluster:
+        for _ in range(steps):
+            cluster.apply()
+        return cluster.gather()
+
+
+def enhance(image: Image, algorithm: np.ndarray, steps: int) -> Image:
+    """Apply an algorithm to an image a number of times."""
     curr = image
-    curr = curr.apply(algorithm)
-    curr = curr.apply(algorithm)
-    curr = curr.trim()
-    return curr.count_lit()
+    for _ in range(steps):
+        curr = curr.apply(algorithm)
+    return curr
 
 
-def part2(image: Image, algorithm: str) -> int:
+def part1(image: Image, algorithm: np.ndarray) -> int:
     """How many pixels are lit in the resulting image?"""
-    curr = image
-    for _ in range(25):
-        curr = curr.apply(algorithm).apply(algorithm).trim()
-    return curr.count_lit()
+    return enhance(image, algorithm, 2).count_lit()
+
+
+def part2(image: Image, algorithm: np.ndarray) -> int:
+    """How many pixels are lit in the resulting image?"""
+    return enhance(image, algorithm, 50).count_lit()
+
 
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    lines = read_input(20, sample=sample)
+    algorithm = parse_algorithm(lines[0])
+    image = Image.from_lines(lines[2:])
+    return part1(image, algorithm) if part == 1 else part2(image, algorithm)
 
-# To make the sample work, remove BUFFER
-lines = read_input(20)
-algorithm = lines[0]
-image = Image.from_lines(lines[2:])
 
-print(part1(image, algorithm))
-print(part2(image, algorithm))
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
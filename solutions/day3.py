@@ -1,49 +1,99 @@
-from helpers import read_input
-from typing import List
+from helpers import BIT_BLOCK, read_bit_matrix
+import numpy as np
+from typing import Union
 
 
-def mcb(numbers: List[List[int]], index: int) -> int:
-    """Determine the most common bit at an index."""
-    return 1 if sum(n[index] for n in numbers) >= len(numbers) / 2 else 0
+def to_int(bits: np.ndarray) -> int:
+    """Pack a row of bits into an integer, most significant bit first."""
+    return int.from_bytes(np.packbits(bits).tobytes(), "big") >> (-len(bits) % 8)
 
 
-def btoi(number: List[int]) -> int:
-    """Convert a bit sequence to an integer."""
-    return int("".join(str(b) for b in number), base=2)
+def count_ones(report: np.ndarray, width: int) -> np.ndarray:
+    """Count the 1s in each bit column of a packed report, unpacking a block of lines at a time."""
+    ones = np.zeros(width, dtype=np.int64)
+    for start in range(0, len(report), BIT_BLOCK):
+        bits = np.unpackbits(report[start : start + BIT_BLOCK], axis=1, count=width)
+        ones += bits.sum(axis=0, dtype=np.int64)
+    return ones
 
 
-def part1(numbers: List[List[int]]) -> int:
+class ReportTrie:
+    """
+    Represents the reports as a binary trie, laid out flat as the reports in sorted order.
+
+    The reports below any node are one contiguous range of the sorted reports,
+    so a node's subtree count is the length of its range. They share every bit
+    above the node, so its children split the range at the first report with
+    those bits followed by a 1, which is found by bisection. Reports of up to
+    64 bits are sorted as uint64 words, and wider ones as byte strings.
+    """
+
+    def __init__(self, report: np.ndarray, width: int):
+        self.width = width
+        self.pad = -width % 8
+        self.row_bytes = report.shape[1]
+        if width <= 64:
+            # Right-align each row in 8 bytes, and read them as big-endian words
+            words = np.zeros((len(report), 8), dtype=np.uint8)
+            words[:, 8 - self.row_bytes :] = report
+            self.reports = np.sort(words.view(">u8").ravel() >> np.uint64(self.pad))
+        else:
+            self.reports = np.sort(report.view(f"S{self.row_bytes}").ravel())
+
+    def value(self, index: int) -> int:
+        """Find the value of the report at an index."""
+        report = self.reports[index]
+        if self.width <= 64:
+            return int(report)
+        # Byte strings lose their trailing zero bytes when they are read
+        return int.from_bytes(report.ljust(self.row_bytes, b"\0"), "big") >> self.pad
+
+    def key(self, value: int) -> Union[np.uint64, bytes]:
+        """Convert a value to the type of the sorted reports, to search for it."""
+        if self.width <= 64:
+            return np.uint64(value)
+        return (value << self.pad).to_bytes(self.row_bytes, "big")
+
+    def find(self, most_common: bool) -> int:
+        """Follow the most (or least) common bit at each node until one report is left."""
+        lo, hi = 0, len(self.reports)
+        for bit in range(self.width - 1, -1, -1):
+            if hi - lo == 1:
+                break
+            prefix = self.value(lo) >> (bit + 1) << (bit + 1)
+            split = lo + int(
+                np.searchsorted(self.reports[lo:hi], self.key(prefix | 1 << bit))
+            )
+            zeros, ones = split - lo, hi - split
+            # 1 is the most common bit on a tie
+            keep_ones = ones >= zeros if most_common else ones < zeros
+            if (keep_ones and ones > 0) or zeros == 0:
+                lo = split
+            else:
+                hi = split
+        return self.value(lo)
+
+
+def part1(report: np.ndarray, width: int) -> int:
     """What is the power consumption of the submarine?"""
-    gamma_bits = []
-    epsilon_bits = []
-    for i in range(len(numbers[0])):
-        bit = mcb(numbers, i)
-        gamma_bits.append(bit)
-        epsilon_bits.append(int(not bit))
-    return btoi(gamma_bits) * btoi(epsilon_bits)
+    ones = count_ones(report, width)
+    gamma = to_int(2 * ones >= len(report))
+    epsilon = gamma ^ ((1 << width) - 1)
+    return gamma * epsilon
 
 
-def part2(numbers: List[List[int]]) -> int:
+def part2(report: np.ndarray, width: int) -> int:
     """What is the life support rating of the submarine?"""
-    oxygen_numbers = list(numbers)
-    oxygen_index = 0
-    while len(oxygen_numbers) > 1:
-        bit = mcb(oxygen_numbers, oxygen_index)
-        oxygen_numbers = [on for on in oxygen_numbers if on[oxygen_index] == bit]
-        oxygen_index += 1
-
-    co2_numbers = list(numbers)
-    co2_index = 0
-    while len(co2_numbers) > 1:
-        bit = mcb(co2_numbers, co2_index)
-        co2_numbers = [cn for cn in co2_numbers if cn[co2_index] != bit]
-        co2_index += 1
+    trie = ReportTrie(report, width)
+    return trie.find(most_common=True) * trie.find(most_common=False)
 
-    return btoi(oxygen_numbers[0]) * btoi(co2_numbers[0])
 
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    report, width = read_bit_matrix(3, sample=sample)
+    return part1(report, width) if part == 1 else part2(report, width)
 
-lines = read_input(3)
-numbers = [[int(bit) for bit in line] for line in lines]
 
-print(part1(numbers))
-print(part2(numbers))
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
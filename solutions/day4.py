@@ -1,73 +1,178 @@
 from helpers import read_input
-from typing import Any, List, Set
-
-
-def chunks(seq: List[Any], n: int):
-    """Yield successive n-sized chunks from a list."""
-    for i in range(0, len(seq), n):
-        yield seq[i : i + n]
+import numpy as np
+from typing import Iterator, List, Set
 
 
 class Board:
-    """Represents a bingo board."""
+    """Represents an N×N bingo board."""
 
     def __init__(self, rows: List[List[int]]):
         self.rows = rows
+        self.size = len(rows)
 
     def __str__(self):
         return str(self.rows)
 
-    def has_won(self, chosen: Set[int]) -> bool:
-        """Determine if a board has won the game."""
-        return (
-            any(all(cell in chosen for cell in self.rows[i]) for i in range(5))  # rows
-            or any(all(row[j] in chosen for row in self.rows) for j in range(5))  # cols
-            or all(self.rows[k][k] in chosen for k in range(5))  # SE/NW
-            or all(self.rows[k][5 - 1 - k] in chosen for k in range(5))  # SW/NE
+
+class Bingo:
+    """
+    Plays every board at once, touching only the cells holding each drawn number.
+
+    The cells of every board are sorted by number, which indexes each number to
+    the (board, row, col) cells holding it. Each board keeps one hit counter per
+    row and column, and the sum of its unmarked cells, so a draw updates the
+    lines it touches and a score needs no rescan.
+    """
+
+    def __init__(self, boards: List[Board]):
+        sizes = np.array([board.size for board in boards], dtype=np.int64)
+        # The counters for board b start at lines[b]: its rows, then its columns
+        lines = np.concatenate(([0], np.cumsum(2 * sizes)[:-1]))
+        cells = sizes * sizes
+        board = np.repeat(np.arange(len(boards)), cells)
+        # The row and column of each cell, counting from the start of its board
+        offset = np.arange(len(board)) - np.repeat(np.cumsum(cells) - cells, cells)
+        size = sizes[board]
+        values = np.fromiter(
+            (cell for b in boards for row in b.rows for cell in row),
+            dtype=np.int64,
+            count=len(board),
         )
+        order = np.argsort(values, kind="stable")
+        self.numbers = values[order]
+        self.board = board[order]
+        self.size = size[order]
+        self.row = (lines[board] + offset // size)[order]
+        self.col = (lines[board] + size + offset % size)[order]
+        self.hits = np.zeros(int(2 * sizes.sum()), dtype=np.int64)
+        self.unmarked = np.zeros(len(boards), dtype=np.int64)
+        np.add.at(self.unmarked, board, values)
+        self.won = np.zeros(len(boards), dtype=bool)
+        self.drawn: Set[int] = set()
 
-    def score(self, chosen: Set[int], last: int) -> int:
-        """Calculate the score of a board."""
-        return last * sum(
-            sum(cell for cell in row if cell not in chosen) for row in self.rows
+    def draw(self, number: int) -> List[int]:
+        """Mark a number on every board, returning the boards which win because of it."""
+        if number in self.drawn:
+            return []
+        self.drawn.add(number)
+        cells = slice(
+            np.searchsorted(self.numbers, number, side="left"),
+            np.searchsorted(self.numbers, number, side="right"),
+        )
+        board, size, row, col = (
+            self.board[cells],
+            self.size[cells],
+            self.row[cells],
+            self.col[cells],
         )
+        np.subtract.at(self.unmarked, board, number)
+        np.add.at(self.hits, row, 1)
+        np.add.at(self.hits, col, 1)
+        full = board[(self.hits[row] == size) | (self.hits[col] == size)]
+        winners = np.unique(full[~self.won[full]])
+        self.won[winners] = True
+        return winners.tolist()
+
+    def score(self, board: int, last: int) -> int:
+        """Calculate the score of a board."""
+        return last * int(self.unmarked[board])
 
 
 def part1(choices: List[int], boards: List[Board]) -> int:
     """What will your final score be if you choose [the winning] board?"""
-    chosen = set()
+    bingo = Bingo(boards)
     for choice in choices:
-        chosen.add(choice)
-        for board in boards:
-            if board.has_won(chosen):
-                return board.score(chosen, choice)
+        winners = bingo.draw(choice)
+        if winners:
+            return bingo.score(winners[0], choice)
     raise ValueError("no winner")
 
 
 def part2(choices: List[int], boards: List[Board]) -> int:
     """Figure out which board will win last. Once it wins, what would its final score be?"""
-    chosen = set()
+    bingo = Bingo(boards)
     last_score = 0
-    remaining = list(boards)
+    remaining = len(boards)
     for choice in choices:
-        chosen.add(choice)
-        winners = set()
-        for i, board in enumerate(remaining):
-            if board.has_won(chosen):
-                last_score = board.score(chosen, choice)
-                winners.add(i)
-        remaining = [b for i, b in enumerate(remaining) if i not in winners]
-        if len(remaining) == 0:
-            break
+        winners = bingo.draw(choice)
+        if winners:
+            last_score = bingo.score(winners[-1], choice)
+            remaining -= len(winners)
+            if remaining == 0:
+                break
     return last_score
 
 
-lines = read_input(4)
-choices = [int(n) for n in lines.pop(0).split(",")]
-boards = [
-    Board([[int(cell) for cell in row.split()] for row in board[1:]])
-    for board in chunks(lines, 6)
-]
+def parse_boards(lines: List[str]) -> Iterator[Board]:
+    """Parse the boards, which are separated by blank lines."""
+    rows: List[List[int]] = []
+    for line in lines + [""]:
+        if line:
+            rows.append([int(cell) for cell in line.split()])
+        elif rows:
+            yield Board(rows)
+            rows = []
+
+
+def play_naively(choices: List[int], boards: List[Board]) -> List[int]:
+    """Score the boards in the order they win, by marking every cell of every board on each draw."""
+    marked = [[[False] * board.size for _ in board.rows] for board in boards]
+    scores: List[int] = []
+    won: Set[int] = set()
+    for choice in choices:
+        for b, board in enumerate(boards):
+            for y, row in enumerate(board.rows):
+                for x, cell in enumerate(row):
+                    marked[b][y][x] |= cell == choice
+        for b, board in enumerate(boards):
+            lines = marked[b] + [list(column) for column in zip(*marked[b])]
+            if b not in won and any(all(line) for line in lines):
+                won.add(b)
+                unmarked = sum(
+                    cell
+                    for row, marks in zip(board.rows, marked[b])
+                    for cell, mark in zip(row, marks)
+                    if not mark
+                )
+                scores.append(choice * unmarked)
+    return scores
+
+
+def test_bingo():
+    # Boards of different sizes, a repeated number on one board, a repeated draw,
+    # and two boards winning on the same draw
+    boards = [
+        Board([[1, 2], [3, 4]]),
+        Board([[5, 1, 6], [7, 2, 8], [9, 10, 11]]),
+        Board([[4, 4], [12, 13]]),
+        Board([[2, 20], [1, 21]]),
+    ]
+    choices = [1, 1, 4, 2, 10]
+    assert part1(choices, boards) == 100
+    assert part2(choices, boards) == 460
+    assert play_naively(choices, boards) == [100, 6, 82, 460]
+    rng = np.random.default_rng(4)
+    boards = [
+        Board(rng.integers(0, 40, (size, size)).tolist())
+        for size in rng.integers(1, 6, 30)
+    ]
+    choices = rng.permutation(40).tolist()
+    scores = play_naively(choices, boards)
+    assert part1(choices, boards) == scores[0]
+    assert part2(choices, boards) == scores[-1]
+
+
+test_bingo()
+
+
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    lines = read_input(4, sample=sample)
+    choices = [int(n) for n in lines[0].split(",")]
+    boards = list(parse_boards(lines[1:]))
+    return part1(choices, boards) if part == 1 else part2(choices, boards)
+
 
-print(part1(choices, boards))
-print(part2(choices, boards))
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
@@ -1,40 +1,286 @@
+from bisect import bisect_left, bisect_right, insort
 from helpers import read_input, Point
 from collections import defaultdict, namedtuple
-from typing import Dict, List, Tuple
-
+from math import inf
+import numpy as np
+from typing import Dict, List, Set, Tuple
 
 Vent = namedtuple("Vent", "start,end")
 
+# Raster the vents when their bounding box, and their total length, have at most this many cells
+RASTER_LIMIT = 1 << 24
+
+# Find the crossings of this many diagonal runs with every other run at once
+CROSSING_BLOCK = 1024
+
+# The families of parallel lines, by the direction of their vents
+HORIZONTAL, VERTICAL, DIAGONAL, ANTIDIAGONAL = range(4)
+
+# Runs of points along one line, as inclusive (first, last) positions
+Runs = List[Tuple[int, int]]
+
 
 def delta(start: Point, end: Point) -> Tuple[int, int]:
     """Compute the directional delta between two points."""
     x = end.x - start.x
     y = end.y - start.y
-    return 0 if x == 0 else x / abs(x), 0 if y == 0 else y / abs(y)
+    return (x > 0) - (x < 0), (y > 0) - (y < 0)
+
+
+def line_of(vent: Vent) -> Tuple[int, int, int, int]:
+    """
+    Find the line a vent lies on, as a family and key, and its span along the line.
+
+    Each family parameterizes its lines by x, except vertical lines which use y:
+    a horizontal line is keyed by y, a vertical one by x, a diagonal by x - y,
+    and an antidiagonal by x + y.
+    """
+    x1, y1, x2, y2 = vent.start.x, vent.start.y, vent.end.x, vent.end.y
+    dx, dy = delta(vent.start, vent.end)
+    if dy == 0:
+        return HORIZONTAL, y1, min(x1, x2), max(x1, x2)
+    if dx == 0:
+        return VERTICAL, x1, min(y1, y2), max(y1, y2)
+    if dx == dy:
+        return DIAGONAL, x1 - y1, min(x1, x2), max(x1, x2)
+    return ANTIDIAGONAL, x1 + y1, min(x1, x2), max(x1, x2)
+
+
+def point_on(family: int, key: int, t: int) -> Tuple[int, int]:
+    """Find the point at a position along a line."""
+    if family == HORIZONTAL:
+        return t, key
+    if family == VERTICAL:
+        return key, t
+    if family == DIAGONAL:
+        return t, t - key
+    return t, key - t
+
+
+def position_on(family: int, x: int, y: int) -> Tuple[int, int]:
+    """Find the key of the line through a point in a family, and the point's position along it."""
+    if family == HORIZONTAL:
+        return y, x
+    if family == VERTICAL:
+        return x, y
+    if family == DIAGONAL:
+        return x - y, x
+    return x + y, x
+
+
+def sweep_runs(spans: List[Tuple[int, int]]) -> Tuple[Runs, Runs]:
+    """Sweep the spans along one line, returning the runs covered at least once and at least twice."""
+    events = sorted(
+        [(first, 1) for first, _ in spans] + [(last + 1, -1) for _, last in spans]
+    )
+    covered: Runs = []
+    overlapped: Runs = []
+    depth = 0
+    for t, change in events:
+        before, depth = depth, depth + change
+        for runs, level in ((covered, 1), (overlapped, 2)):
+            if before < level <= depth:
+                runs.append((t, t))  # a run starts; its end is filled in when it stops
+            elif depth < level <= before:
+                runs[-1] = (runs[-1][0], t - 1)
+    return covered, overlapped
+
+
+def crossings_hv(
+    horizontals: Dict[int, Runs], verticals: Dict[int, Runs]
+) -> Set[Tuple[int, int]]:
+    """Find where horizontal and vertical runs cross, sweeping from left to right."""
+    # Starts sort before queries, and queries before stops, at the same x
+    events = []
+    for y, runs in horizontals.items():
+        for first, last in runs:
+            events.append((first, 0, y, 0))
+            events.append((last, 2, y, 0))
+    for x, runs in verticals.items():
+        for first, last in runs:
+            events.append((x, 1, first, last))
+    active: List[int] = []  # the y of each horizontal run under the sweep line, sorted
+    points = set()
+    for x, kind, a, b in sorted(events):
+        if kind == 0:
+            insort(active, a)
+        elif kind == 2:
+            del active[bisect_left(active, a)]
+        else:
+            for y in active[bisect_left(active, a) : bisect_right(active, b)]:
+                points.add((x, y))
+    return points
+
+
+def crossings_diagonal(
+    family: int, runs: Dict[int, Runs], other: int, other_runs: Dict[int, Runs]
+) -> Set[Tuple[int, int]]:
+    """Find where the runs on diagonal lines cross the runs of another family, all pairs at once."""
+    a = np.array([(key, first, last) for key, rs in runs.items() for first, last in rs])
+    b = np.array(
+        [(key, first, last) for key, rs in other_runs.items() for first, last in rs]
+    )
+    points: Set[Tuple[int, int]] = set()
+    if len(b) == 0:
+        return points
+    k2, first2, last2 = (column[None, :] for column in b.T)
+    # Pair blocks of rows with every other run, to bound the memory used
+    for start in range(0, len(a), CROSSING_BLOCK):
+        block = a[start : start + CROSSING_BLOCK]
+        k1, first1, last1 = (column[:, None] for column in block.T)
+        # Each diagonal line is x - y = k1 or x + y = k1; solve for x on it, then for the
+        # position on the other line, and keep the pairs where both are within their runs
+        valid = np.ones((len(block), len(b)), dtype=bool)
+        sign = 1 if family == DIAGONAL else -1
+        if other == HORIZONTAL:
+            x = k1 + sign * k2
+            t = x
+        elif other == VERTICAL:
+            x = np.broadcast_to(k2, valid.shape)
+            t = sign * (x - k1)
+        else:
+            # A diagonal meets an antidiagonal at x = (k1 + k2) / 2, which must be whole
+            valid = (k1 + k2) % 2 == 0
+            x = (k1 + k2) // 2
+            t = x
+        valid &= (first1 <= x) & (x <= last1) & (first2 <= t) & (t <= last2)
+        rows, columns = np.nonzero(valid)
+        for i, j in zip(rows, columns):
+            points.add(point_on(family, int(block[i, 0]), int(x[i, j])))
+    return points
+
+
+def sweep_overlaps(vents: List[Vent]) -> int:
+    """
+    Count the points where vents overlap, without visiting their points.
+
+    A point covered twice is either covered twice along one line, which a sweep
+    over each line's span events finds as a run, or lies on lines from two
+    families, which cross at most once. The runs are summed, then every
+    crossing adds 1 if no run holds it, or corrects for each extra run holding it.
+    """
+    spans: Dict[Tuple[int, int], List[Tuple[int, int]]] = defaultdict(list)
+    for vent in vents:
+        family, key, first, last = line_of(vent)
+        spans[(family, key)].append((first, last))
+    covered: List[Dict[int, Runs]] = [{} for _ in range(4)]
+    overlapped: List[Dict[int, Runs]] = [{} for _ in range(4)]
+    for (family, key), line_spans in spans.items():
+        covered[family][key], overlapped[family][key] = sweep_runs(line_spans)
+
+    crossings = crossings_hv(covered[HORIZONTAL], covered[VERTICAL])
+    for family in (DIAGONAL, ANTIDIAGONAL):
+        for other in range(family):
+            crossings |= crossings_diagonal(
+                family, covered[family], other, covered[other]
+            )
+
+    count = sum(
+        last - first + 1
+        for runs in overlapped
+        for rs in runs.values()
+        for first, last in rs
+    )
+    for x, y in crossings:
+        holding = 0
+        for family in range(4):
+            key, t = position_on(family, x, y)
+            runs = overlapped[family].get(key, [])
+            i = bisect_right(runs, (t, inf)) - 1  # the last run starting at or before t
+            if i >= 0 and runs[i][1] >= t:
+                holding += 1
+        count += 1 - holding
+    return count
+
+
+def raster_overlaps(vents: List[Vent]) -> int:
+    """Count the points where vents overlap, by adding every point of every vent to a dense grid."""
+    ends = np.array(
+        [(v.start.x, v.start.y, v.end.x, v.end.y) for v in vents], dtype=np.int64
+    )
+    x1, y1, x2, y2 = ends.T
+    dx, dy = np.sign(x2 - x1), np.sign(y2 - y1)
+    lengths = np.maximum(abs(x2 - x1), abs(y2 - y1)) + 1
+    # Expand each vent into its points: the vent of each point, and how far along it is
+    vent = np.repeat(np.arange(len(vents)), lengths)
+    along = np.arange(len(vent)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    xs = x1[vent] + dx[vent] * along
+    ys = y1[vent] + dy[vent] * along
+    left, top = xs.min(), ys.min()
+    grid = np.zeros((ys.max() - top + 1, xs.max() - left + 1), dtype=np.int32)
+    np.add.at(grid, (ys - top, xs - left), 1)
+    return int((grid >= 2).sum())
 
 
 def count_overlap_points(vents: List[Vent]) -> int:
     """At how many points do at least two lines overlap?"""
-    terrain: Dict[Point, int] = defaultdict(int)
-    for v in vents:
-        dx, dy = delta(v.start, v.end)
-        curr = v.start
-        while curr != v.end:
-            terrain[curr] += 1
-            curr = Point(x=curr.x + dx, y=curr.y + dy)
-        terrain[v.end] += 1
-    return sum(True for n in terrain.values() if n >= 2)
-
-
-lines = read_input(5)
-vents = [
-    Vent(
-        start=Point(*map(int, entry[0].split(","))),
-        end=Point(*map(int, entry[1].split(","))),
+    if len(vents) == 0:
+        return 0
+    xs = [p.x for v in vents for p in v]
+    ys = [p.y for v in vents for p in v]
+    area = (max(xs) - min(xs) + 1) * (max(ys) - min(ys) + 1)
+    length = sum(
+        max(abs(v.end.x - v.start.x), abs(v.end.y - v.start.y)) + 1 for v in vents
     )
-    for entry in [line.split(" -> ") for line in lines]
-]
+    if area <= RASTER_LIMIT and length <= RASTER_LIMIT:
+        return raster_overlaps(vents)
+    return sweep_overlaps(vents)
+
+
+def part1(vents: List[Vent]) -> int:
+    """Consider only horizontal and vertical lines. At how many points do at least two lines overlap?"""
+    return count_overlap_points(
+        [v for v in vents if v.start.x == v.end.x or v.start.y == v.end.y]
+    )
+
+
+def part2(vents: List[Vent]) -> int:
+    """Consider all of the lines. At how many points do at least two lines overlap?"""
+    return count_overlap_points(vents)
+
+
+def vents_from(ends: List[Tuple[int, int, int, int]]) -> List[Vent]:
+    """Create vents from their (x1, y1, x2, y2) ends."""
+    return [Vent(Point(x1, y1), Point(x2, y2)) for x1, y1, x2, y2 in ends]
+
+
+def test_sweep_overlaps():
+    data = [
+        # Overlapping collinear runs, on each family of lines
+        ([(0, 0, 5, 0), (3, 0, 8, 0), (4, 0, 6, 0)], 4),
+        ([(2, 1, 2, 6), (2, 4, 2, 0)], 4),
+        ([(0, 0, 4, 4), (6, 6, 2, 2)], 3),
+        ([(0, 6, 6, 0), (5, 1, 1, 5), (3, 3, 0, 6)], 6),
+        # A diagonal and an antidiagonal with an odd key sum never meet on a point
+        ([(0, 0, 3, 3), (0, 3, 3, 0)], 0),
+        ([(0, 0, 3, 3), (0, 3, 3, 0), (0, 4, 4, 0)], 1),
+        # Crossings inside an overlapped run count once
+        ([(0, 2, 6, 2), (6, 2, 0, 2), (3, 0, 3, 5), (1, 0, 5, 4)], 7),
+        ([(0, 0, 4, 4), (4, 4, 0, 0), (0, 4, 4, 0)], 5),
+        ([(0, 2, 6, 2), (0, 2, 6, 2), (3, 0, 3, 5), (3, 5, 3, 0)], 12),
+    ]
+    for ends, expected in data:
+        vents = vents_from(ends)
+        assert sweep_overlaps(vents) == expected, ends
+        assert raster_overlaps(vents) == expected, ends
+
+
+test_sweep_overlaps()
+
+
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    lines = read_input(5, sample=sample)
+    vents = [
+        Vent(
+            start=Point(*map(int, entry[0].split(","))),
+            end=Point(*map(int, entry[1].split(","))),
+        )
+        for entry in [line.split(" -> ") for line in lines]
+    ]
+    return part1(vents) if part == 1 else part2(vents)
+
 
-orthogonal_vents = [v for v in vents if v.start.x == v.end.x or v.start.y == v.end.y]
-print(count_overlap_points(orthogonal_vents))
-print(count_overlap_points(vents))
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
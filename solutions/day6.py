@@ -1,33 +1,110 @@
-from helpers import read_input
-from collections import defaultdict
-from typing import DefaultDict
+from helpers import read_ints
+from typing import Iterable, List
 
+TIMERS = 9  # a new fish starts at timer 8
+RESET = 6  # a fish which has spawned starts again at timer 6
 
-Population = DefaultDict[int, int]
+# The number of fish with each timer value
+Population = List[int]
 
 
-def step(population: Population) -> Population:
-    """Advance the population by one step."""
-    after = defaultdict(int)
-    for age in range(8):
-        after[age] = population[age + 1]
-    after[6] += population[0]
-    after[8] = population[0]
-    return after
+class School:
+    """
+    Simulates a population in place, as a ring buffer of the counts for each timer.
+
+    Slot (head + t) % 9 holds the fish with timer t. Each day the fish at timer 0
+    become the new fish at timer 8 simply by advancing the head, which leaves them
+    in the same slot, and their parents are added back in at timer 6.
+    """
+
+    def __init__(self, population: Population):
+        self.counts = list(population)
+        self.head = 0
+        self.day = 0
+
+    def step(self):
+        """Advance the population by one day."""
+        spawning = self.counts[self.head]
+        self.head = (self.head + 1) % TIMERS
+        self.counts[(self.head + RESET) % TIMERS] += spawning
+        self.day += 1
+
+    def size(self) -> int:
+        """Count the fish."""
+        return sum(self.counts)
+
+
+class Descendants:
+    """
+    Counts the fish descended from a single fish, checkpointing the count for every day.
+
+    A fish with timer t behaves like a fish with timer 0 which starts t days
+    later, so the counts for one fish with timer 0 answer every timer, day and
+    starting population. The counts are extended on demand and kept.
+    """
+
+    def __init__(self):
+        first = [0] * TIMERS
+        first[0] = 1
+        self.school = School(first)
+        self.sizes = [1]
+
+    def after(self, timer: int, days: int) -> int:
+        """Count the fish descended from one fish with a timer after a number of days."""
+        if days <= timer:
+            return 1
+        while len(self.sizes) <= days - timer:
+            self.school.step()
+            self.sizes.append(self.school.size())
+        return self.sizes[days - timer]
+
+
+DESCENDANTS = Descendants()
 
 
 def simulate(population: Population, days: int) -> int:
     """Simulate the population size after a number of days."""
-    curr = population
+    school = School(population)
     for _ in range(days):
-        curr = step(curr)
-    return sum(curr.values())
+        school.step()
+    return school.size()
+
+
+def simulate_many(population: Population, horizons: Iterable[int]) -> List[int]:
+    """Find the population size after each of a number of days, using the cached descendant counts."""
+    return [
+        sum(
+            count * DESCENDANTS.after(timer, days)
+            for timer, count in enumerate(population)
+        )
+        for days in horizons
+    ]
+
+
+def part1(population: Population) -> int:
+    """How many lanternfish would there be after 80 days?"""
+    return simulate_many(population, [80])[0]
+
+
+def part2(population: Population) -> int:
+    """How many lanternfish would there be after 256 days?"""
+    return simulate_many(population, [256])[0]
+
+
+def count_population(timers: Iterable[int]) -> Population:
+    """Count the fish with each timer value."""
+    population = [0] * TIMERS
+    for timer in timers:
+        population[timer] += 1
+    return population
+
 
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    population = count_population(read_ints(6, sample=sample))
+    return part1(population) if part == 1 else part2(population)
 
-lines = read_input(6)
-population: Population = defaultdict(int)
-for raw_fish in lines[0].split(","):
-    population[int(raw_fish)] += 1
 
-print(simulate(population, 80))
-print(simulate(population, 256))
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
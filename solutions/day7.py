@@ -1,32 +1,91 @@
-from helpers import read_input
-from typing import List
+from helpers import read_ints
+import numpy as np
+from typing import Sequence
 
 
-def part1(crabs: List[int]) -> int:
+class Crabs:
+    """
+    Represents the crabs as sorted positions with prefix sums, to find exact alignment costs.
+
+    The crabs at or left of a target are found by bisection, and the prefix sums
+    give the total distance from both sides without visiting any crab. Costs only
+    depend on distances, so the sums are taken from the middle of the positions,
+    in int64 while n * range^2 fits in it, and in Python ints beyond that.
+    """
+
+    def __init__(self, positions: Sequence[int]):
+        self.positions = np.sort(np.asarray(positions, dtype=np.int64))
+        n = len(self.positions)
+        lo, hi = (int(self.positions[0]), int(self.positions[-1])) if n else (0, 0)
+        self.origin = (lo + hi) // 2
+        # Every target is within 3 of the positions, so no offset is over reach, and
+        # every term of a cost is within n * (2 * reach + 1)^2
+        reach = max(hi - self.origin, self.origin - lo) + 3
+        self.dtype = np.int64 if n * (2 * reach + 1) ** 2 < 2**63 else object
+        offsets = self.positions.astype(self.dtype) - self.origin
+        self.prefix = np.concatenate(([0], np.cumsum(offsets)))
+        self.total = int(self.prefix[-1])
+        self.squares = int(np.dot(offsets, offsets))
+
+    def offsets(self, targets: np.ndarray) -> np.ndarray:
+        """Measure targets from the origin of the sums."""
+        return targets.astype(self.dtype) - self.origin
+
+    def linear_costs(self, targets: np.ndarray) -> np.ndarray:
+        """Find the fuel to align at each target, where each step costs 1."""
+        n = len(self.positions)
+        left = np.searchsorted(self.positions, targets, side="right")
+        left_sum = self.prefix[left]
+        t = self.offsets(targets)
+        return (t * left - left_sum) + (self.total - left_sum - t * (n - left))
+
+    def triangular_costs(self, targets: np.ndarray) -> np.ndarray:
+        """Find the fuel to align at each target, where each step costs 1 more than the last."""
+        # Moving d costs d(d+1)/2, and the sum of d^2 expands into sums over the positions
+        n = len(self.positions)
+        t = self.offsets(targets)
+        squares = self.squares - 2 * t * self.total + n * t * t
+        return (squares + self.linear_costs(targets)) // 2
+
+
+def part1(crabs: Crabs) -> int:
     """How much fuel must they spend to align to [the optimal] position?"""
-    best_score = int(1e9)
-    for pos in range(min(crabs), max(crabs) + 1):
-        score = sum(abs(crab - pos) for crab in crabs)
-        if score < best_score:
-            best_score = score
-    return best_score
+    # The total distance is smallest at the median
+    median = crabs.positions[(len(crabs.positions) - 1) // 2]
+    return int(crabs.linear_costs(np.array([median]))[0])
 
 
-def part2(crabs: List[int]) -> int:
+def part2(crabs: Crabs) -> int:
     """How much fuel must they spend to align to [the optimal] position?"""
-    best_score = int(1e9)
-    for pos in range(min(crabs), max(crabs) + 1):
-        score = 0
-        for crab in crabs:
-            diff = abs(crab - pos)
-            score += (diff * (diff + 1)) // 2  # summation formula: 1 to diff
-        if score < best_score:
-            best_score = score
-    return best_score
-
-
-lines = read_input(7)
-crabs = [int(crab) for crab in lines[0].split(",")]
-
-print(part1(crabs))
-print(part2(crabs))
+    # The cost is convex, with its real minimum within 1/2 of the mean, so the
+    # best integer position is one of the few around it
+    mean = crabs.origin + crabs.total // len(crabs.positions)
+    targets = np.arange(mean - 1, mean + 3, dtype=np.int64)
+    return int(crabs.triangular_costs(targets).min())
+
+
+def test_large_positions():
+    # Costs too large for int64 are still exact
+    positions = [0, 3_000_000_000, 5_000_000_000, 5_000_000_001]
+    crabs = Crabs(positions)
+    assert crabs.dtype == object
+    for target in range(4_000_000_000, 4_000_000_010):
+        distances = [abs(p - target) for p in positions]
+        linear = crabs.linear_costs(np.array([target]))[0]
+        triangular = crabs.triangular_costs(np.array([target]))[0]
+        assert linear == sum(distances)
+        assert triangular == sum(d * (d + 1) // 2 for d in distances)
+
+
+test_large_positions()
+
+
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    crabs = Crabs(read_ints(7, sample=sample))
+    return part1(crabs) if part == 1 else part2(crabs)
+
+
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
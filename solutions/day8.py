@@ -1,9 +1,8 @@
-from helpers import read_input
-from collections import namedtuple
-from itertools import permutations
+from helpers import map_input
+import mmap
+import numpy as np
+from typing import Tuple, Union
 
-
-DIGITS = frozenset(range(10))
 SEGMENTS = "abcdefg"
 DIGIT_TO_SEGMENTS = {
     0: "abcefg",
@@ -17,56 +16,104 @@ DIGIT_TO_SEGMENTS = {
     8: "abcdefg",
     9: "abcdfg",
 }
-SEGMENTS_TO_DIGIT = {s: d for d, s in DIGIT_TO_SEGMENTS.items()}
-ALL_DIGIT_SEGMENTS = frozenset(DIGIT_TO_SEGMENTS.values())
-
-
-Display = namedtuple("Display", ("patterns", "outputs"))
-
-
-def transform(pattern: str, key: str) -> str:
-    """Apply a transformation key to a pattern."""
-    lookup = {s: key[i] for i, s in enumerate(SEGMENTS)}
-    return "".join(sorted(lookup[s] for s in pattern))
-
-
-def is_valid_transformation(display: Display, key: str) -> bool:
-    """Check if a transformation is valid."""
-    for p in display.patterns:
-        if transform(p, key) not in ALL_DIGIT_SEGMENTS:
-            return False
-    for o in display.outputs:
-        if transform(o, key) not in ALL_DIGIT_SEGMENTS:
-            return False
-    return True
-
-
-def solve_display(display: Display):
-    """Solve a display by brute-force."""
-    for perm in permutations(SEGMENTS):
-        key = "".join(perm)
-        if is_valid_transformation(display, key):
-            return [SEGMENTS_TO_DIGIT[transform(o, key)] for o in display.outputs]
-    else:  # nobreak
-        raise ValueError(str(display))
-
-
-lines = read_input(8)
-displays = [
-    Display(
-        patterns=tuple(row[0].split()),
-        outputs=tuple(row[1].split()),
-    )
-    for row in [line.split(" | ") for line in lines]
-]
-
-part1 = 0
-part2 = 0
-for display in displays:
-    solution = solve_display(display)
-    for d in solution:
-        if d in [1, 4, 7, 8]:
-            part1 += 1
-    part2 += int("".join(str(d) for d in solution))
-print(part1)
-print(part2)
+PATTERNS, OUTPUTS = 10, 4
+
+
+def to_masks(data: Union[bytes, mmap.mmap]) -> np.ndarray:
+    """Encode every word of lowercase letters as a 7-bit mask of its segments."""
+    chars = np.frombuffer(data, dtype=np.uint8)
+    letters = (chars >= ord("a")) & (chars <= ord("g"))
+    # Each word is a run of letters, which starts at a letter following a non-letter
+    starts = letters & ~np.concatenate(([False], letters[:-1]))
+    bits = np.left_shift(1, chars[letters] - ord("a"), dtype=np.uint8)
+    if len(bits) == 0:
+        return bits
+    return np.bitwise_or.reduceat(bits, np.flatnonzero(starts[letters]))
+
+
+def segment_bits(masks: np.ndarray) -> np.ndarray:
+    """Expand masks into an extra axis of 7 bits."""
+    return (masks[..., None] >> np.arange(len(SEGMENTS), dtype=np.uint8)) & 1
+
+
+def signatures(patterns: np.ndarray, words: np.ndarray) -> np.ndarray:
+    """
+    Score each word by how many of its display's ten patterns light each of its segments, summed.
+
+    Rewiring the segments changes which wires a digit uses, but not its
+    signature, and the ten digits happen to have ten different signatures.
+    """
+    frequency = segment_bits(patterns).sum(axis=-2, dtype=np.int64)
+    return np.einsum("nws,ns->nw", segment_bits(words).astype(np.int64), frequency)
+
+
+def signature_table() -> np.ndarray:
+    """Build a table from each signature to the digit with it."""
+    canonical = to_masks(" ".join(DIGIT_TO_SEGMENTS[d] for d in range(10)).encode())
+    table = np.full(PATTERNS * len(SEGMENTS) + 1, -1, dtype=np.int64)
+    table[signatures(canonical[None, :], canonical[None, :])[0]] = np.arange(10)
+    assert (table >= 0).sum() == 10, "the signatures must be distinct"
+    return table
+
+
+SIGNATURE_TO_DIGIT = signature_table()
+
+
+def decode(patterns: np.ndarray, outputs: np.ndarray) -> np.ndarray:
+    """Decode the output digits of every display at once."""
+    digits = SIGNATURE_TO_DIGIT[signatures(patterns, outputs)]
+    if (digits < 0).any():
+        display = int(np.nonzero(digits < 0)[0][0])
+        raise ValueError(f"display {display} has an output which is no digit")
+    return digits
+
+
+def part1(digits: np.ndarray) -> int:
+    """In the output values, how many times do digits 1, 4, 7, or 8 appear?"""
+    return int(np.isin(digits, [1, 4, 7, 8]).sum())
+
+
+def part2(digits: np.ndarray) -> int:
+    """What do you get if you add up all of the output values?"""
+    return int((digits @ 10 ** np.arange(OUTPUTS - 1, -1, -1)).sum())
+
+
+def test_decode():
+    line = b"acedgfb cdfbe gcdfa fbcad dab cefabd cdfgeb eafb cagedb ab | cdfeb fcadb cdfeb cdbaf"
+    displays = to_masks(line).reshape(-1, PATTERNS + OUTPUTS)
+    digits = decode(displays[:, :PATTERNS], displays[:, PATTERNS:])
+    assert digits.tolist() == [[5, 3, 5, 3]]
+    # A repeated letter lights its segment once
+    assert to_masks(b"ab aab abba").tolist() == [0b11] * 3
+    # An output lighting segments in a way no digit does has no digit's signature
+    unknown = to_masks(line.replace(b"| cdfeb", b"| ga"))
+    try:
+        decode(unknown[None, :PATTERNS], unknown[None, PATTERNS:])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("decoded an output which is no digit")
+
+
+test_decode()
+
+
+def read_displays(sample: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Read the masks of the patterns and outputs of every display."""
+    with map_input(8, sample=sample) as m:
+        masks = to_masks(m)
+    if len(masks) % (PATTERNS + OUTPUTS) != 0:
+        raise ValueError("every display must have 10 patterns and 4 outputs")
+    displays = masks.reshape(-1, PATTERNS + OUTPUTS)
+    return displays[:, :PATTERNS], displays[:, PATTERNS:]
+
+
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    digits = decode(*read_displays(sample=sample))
+    return part1(digits) if part == 1 else part2(digits)
+
+
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
@@ -1,79 +1,138 @@
-from helpers import read_input, Point
-from collections import deque
-from functools import reduce
-from operator import mul
-from typing import List, Optional, Set
+from helpers import read_digit_grid
+from functools import lru_cache
+import numpy as np
+from typing import List
 
+WALL = 9  # locations of height 9 are not in any basin
 
-DrainageMap = List[List[Optional[Point]]]
 
+@lru_cache(maxsize=None)
+def read_height_map(sample: bool = False) -> np.ndarray:
+    """Read the height map, padded with walls so every location has four neighbours."""
+    cells, width, height = read_digit_grid(9, sample=sample)
+    return pad_heights(np.frombuffer(cells, dtype=np.uint8).reshape(height, width))
 
-def adjacent_to(p: Point, height: int, width: int) -> Set[Point]:
-    """Returns the set of points cardinally adjacent to a point."""
-    return set(
-        Point(ax, ay)
-        for ax, ay in [(p.x - 1, p.y), (p.x, p.y - 1), (p.x + 1, p.y), (p.x, p.y + 1)]
-        if 0 <= ay < height and 0 <= ax < width
+
+def pad_heights(heights: np.ndarray) -> np.ndarray:
+    """Pad a height map with walls, so every location has four neighbours."""
+    return np.pad(heights, 1, constant_values=WALL)
+
+
+def low_points(height_map: np.ndarray) -> np.ndarray:
+    """Find the locations lower than all four of their neighbours, as a mask of the unpadded map."""
+    inner = height_map[1:-1, 1:-1]
+    return (
+        (inner < height_map[:-2, 1:-1])
+        & (inner < height_map[2:, 1:-1])
+        & (inner < height_map[1:-1, :-2])
+        & (inner < height_map[1:-1, 2:])
     )
 
 
-def part1(height_map: List[List[int]]) -> int:
+def label_basins(height_map: np.ndarray) -> np.ndarray:
+    """
+    Label every location with the flat index of the root of its basin; walls are their own roots.
+
+    Runs union-find over every location at once. Each round, every pair of
+    neighbouring basin locations with different roots hooks the larger root
+    under the smaller, and then the paths are compressed until every location
+    points at its root. Every set with a neighbouring set merges each round, so
+    the rounds are logarithmic in the size of the map.
+    """
+    flat = height_map.ravel()
+    basin = flat != WALL
+    parent = np.arange(len(flat), dtype=np.int32 if len(flat) < 2**31 else np.int64)
+    hooked = True
+    while hooked:
+        hooked = False
+        for offset in (1, height_map.shape[1]):
+            a, b = parent[:-offset], parent[offset:]
+            pairs = basin[:-offset] & basin[offset:] & (a != b)
+            if pairs.any():
+                a, b = a[pairs], b[pairs]
+                np.minimum.at(parent, np.maximum(a, b), np.minimum(a, b))
+                hooked = True
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return parent
+
+
+def part1(height_map: np.ndarray) -> int:
     """What is the sum of the risk levels of all low points on your heightmap?"""
-    risk = 0
-    height, width = len(height_map), len(height_map[0])
-    for y in range(height):
-        for x in range(width):
-            cell = height_map[y][x]
-            if all(
-                cell < height_map[p.y][p.x]
-                for p in adjacent_to(Point(x, y), height, width)
-            ):
-                risk += cell + 1
-    return risk
-
-
-def explore_basin(
-    bottom: Point, drains_to: DrainageMap, height: int, width: int
-) -> Set[Point]:
-    """Explore a basin from the bottom upwards."""
-    visited: Set[Point] = set()
-    queue = deque([bottom])
-    while len(queue) > 0:
-        curr = queue.popleft()
-        if curr in visited:
-            continue
-        visited.add(curr)
-        for adj in adjacent_to(curr, height, width):
-            if drains_to[adj.y][adj.x] == curr:
-                queue.append(adj)
-    return visited
+    lows = height_map[1:-1, 1:-1][low_points(height_map)]
+    return int(lows.sum(dtype=np.int64) + len(lows))
 
 
-def part2(height_map: List[List[int]]) -> int:
+def part2(height_map: np.ndarray) -> int:
     """What do you get if you multiply together the sizes of the three largest basins?"""
-    height, width = len(height_map), len(height_map[0])
-    drains_to: DrainageMap = [[None] * width for _ in range(height)]
-    bottoms: Set[Point] = set()
-    for y in range(height):
-        for x in range(width):
-            cell = height_map[y][x]
-            if cell == 9:
-                continue  # locations of size 9 are not in any basin
-            lower_adj = [
-                p
-                for p in adjacent_to(Point(x, y), height, width)
-                if cell > height_map[p.y][p.x]
-            ]
-            if len(lower_adj) == 0:
-                bottoms.add(Point(x, y))
-            else:
-                drains_to[y][x] = min(lower_adj, key=lambda p: height_map[p.y][p.x])
-
-    basin_sizes = [len(explore_basin(b, drains_to, height, width)) for b in bottoms]
-    return reduce(mul, sorted(basin_sizes, reverse=True)[:3])
-
-
-lines = read_input(9)
-height_map = [list(map(int, list(line))) for line in lines]
-print(part1(height_map))
-print(part2(height_map))
+    roots = label_basins(height_map)[height_map.ravel() != WALL]
+    sizes = np.bincount(roots)
+    # Most roots label no basin, and a map may have fewer than three basins
+    sizes = sizes[sizes > 0]
+    return int(np.prod(np.sort(sizes)[-3:], dtype=np.int64))
+
+
+def flood_basin_sizes(heights: np.ndarray) -> List[int]:
+    """Find the size of every basin by flood filling from each unvisited location."""
+    height, width = heights.shape
+    seen = heights == WALL
+    sizes = []
+    for y, x in zip(*np.nonzero(~seen)):
+        if seen[y, x]:
+            continue
+        seen[y, x] = True
+        stack, size = [(y, x)], 0
+        while stack:
+            cy, cx = stack.pop()
+            size += 1
+            for ny, nx in ((cy - 1, cx), (cy + 1, cx), (cy, cx - 1), (cy, cx + 1)):
+                if 0 <= ny < height and 0 <= nx < width and not seen[ny, nx]:
+                    seen[ny, nx] = True
+                    stack.append((ny, nx))
+        sizes.append(size)
+    return sizes
+
+
+def test_basins():
+    data = [
+        ([[1, 2], [3, 4]], 2, 4),
+        ([[1, 9, 1], [2, 9, 2]], 2 + 2, 2 * 2),
+        (
+            [
+                [2, 1, 9, 9, 9, 4, 3, 2, 1, 0],
+                [3, 9, 8, 7, 8, 9, 4, 9, 2, 1],
+                [9, 8, 5, 6, 7, 8, 9, 8, 9, 2],
+                [8, 7, 6, 7, 8, 9, 6, 7, 8, 9],
+                [9, 8, 9, 9, 9, 6, 5, 6, 7, 8],
+            ],
+            15,
+            1134,
+        ),
+    ]
+    for heights, risk, product in data:
+        height_map = pad_heights(np.array(heights, dtype=np.uint8))
+        assert part1(height_map) == risk
+        assert part2(height_map) == product
+    rng = np.random.default_rng(9)
+    for _ in range(20):
+        heights = rng.integers(0, 10, (rng.integers(1, 30), rng.integers(1, 30)))
+        height_map = pad_heights(heights.astype(np.uint8))
+        sizes = sorted(flood_basin_sizes(heights), reverse=True)[:3]
+        assert part2(height_map) == int(np.prod(sizes, dtype=np.int64))
+
+
+test_basins()
+
+
+def solve(part: int, sample: bool = False) -> int:
+    """Solve one part of the puzzle."""
+    height_map = read_height_map(sample=sample)
+    return part1(height_map) if part == 1 else part2(height_map)
+
+
+if __name__ == "__main__":
+    print(solve(1))
+    print(solve(2))
@@ -1,9 +1,18 @@
+from array import array
+from contextlib import contextmanager
+from copy import copy
 from dataclasses import dataclass
+import logging
+import mmap
+import numpy as np
 from pathlib import Path
-from typing import Iterator, List, Set
+from typing import Any, Callable, Dict, Iterator, List, Set, Tuple
 
 INPUT_DIR = Path(__file__).parent.parent / "inputs"
 
+# Maps ASCII digits to their values, for use with bytes.translate
+DIGITS = bytes.maketrans(b"0123456789", bytes(range(10)))
+
 
 @dataclass(frozen=True, eq=True)
 class Point:
@@ -31,8 +40,199 @@ class Point:
         )
 
 
+class Grid2D:
+    """
+    Represents a 2D grid of small integers, stored as a flat row-major array.
+
+    The grid is surrounded by a one-cell border of padding, so the neighbour
+    offsets can be added to the index of any cell without bounds checks.
+    """
+
+    def __init__(self, width: int, height: int, pad: int = 0, typecode: str = "B"):
+        self.width = width
+        self.height = height
+        self.pad = pad
+        self.stride = width + 2
+        self.cells = array(typecode, [pad]) * (self.stride * (height + 2))
+        # Offsets from a cell to its cardinal neighbours
+        self.orthogonal = (-self.stride, -1, 1, self.stride)
+        # Offsets from a cell to its cardinal and diagonal neighbours
+        self.adjacent = (
+            -self.stride - 1,
+            -self.stride,
+            -self.stride + 1,
+            -1,
+            1,
+            self.stride - 1,
+            self.stride,
+            self.stride + 1,
+        )
+
+    @staticmethod
+    def from_array(values: array, width: int, height: int, pad: int = 0) -> "Grid2D":
+        """Create a grid from a flat row-major array of values."""
+        grid = Grid2D(width, height, pad, values.typecode)
+        for y in range(height):
+            start = grid.index(0, y)
+            grid.cells[start : start + width] = values[y * width : (y + 1) * width]
+        return grid
+
+    def index(self, x: int, y: int) -> int:
+        """Find the index of the cell at (x,y)."""
+        return (y + 1) * self.stride + x + 1
+
+    def coords(self, index: int) -> Tuple[int, int]:
+        """Find the (x,y) coordinates of the cell at an index."""
+        y, x = divmod(index, self.stride)
+        return x - 1, y - 1
+
+    def indices(self) -> Iterator[int]:
+        """Generate the index of every cell inside the grid, row by row."""
+        for y in range(self.height):
+            start = self.index(0, y)
+            yield from range(start, start + self.width)
+
+    def rows(self) -> Iterator[array]:
+        """Generate a copy of each row of the grid."""
+        for y in range(self.height):
+            start = self.index(0, y)
+            yield self.cells[start : start + self.width]
+
+    def repad(self):
+        """Restore the padding, which may have been overwritten."""
+        border = array(self.cells.typecode, [self.pad]) * self.stride
+        self.cells[: self.stride] = border
+        self.cells[-self.stride :] = border
+        for y in range(self.height):
+            start = self.index(0, y)
+            self.cells[start - 1] = self.cells[start + self.width] = self.pad
+
+    def copy(self) -> "Grid2D":
+        """Copy a grid."""
+        grid = copy(self)
+        grid.cells = self.cells[:]
+        return grid
+
+
+class Tracer:
+    """
+    Emits structured trace events through a logger.
+
+    Call sites check `enabled` before building anything, so a disabled tracer
+    costs one attribute check. Fields are passed as a callable, which is only
+    evaluated for events that pass the level and sampling checks.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self.enabled = False
+        self.level = logging.CRITICAL
+        self.every = 1
+        self.count = 0
+
+    def enable(self, level: int, every: int = 1):
+        """Emit events at or above a level, sampling every nth event."""
+        self.enabled = True
+        self.level = level
+        self.every = every
+        self.count = 0
+
+    def disable(self):
+        """Stop emitting events."""
+        self.enabled = False
+
+    def emit(self, level: int, message: str, fields: Callable[[], Dict[str, Any]]):
+        """Emit an event if its level and the sampling allow."""
+        if level < self.level:
+            return
+        self.count += 1
+        if self.count % self.every == 0:
+            self.logger.log(level, message, extra=fields())
+
+
+def input_path(day: int, sample: bool = False) -> Path:
+    """Find the path to an input file."""
+    return INPUT_DIR / f"day{day}{'.sample' if sample else ''}.txt"
+
+
 def read_input(day: int, sample: bool = False) -> List[str]:
     """Read the lines from an input file."""
-    file_name = f"day{day}{'.sample' if sample else ''}.txt"
-    with open(INPUT_DIR / file_name) as f:
+    with open(input_path(day, sample)) as f:
         return [line.strip() for line in f.readlines()]
+
+
+@contextmanager
+def map_input(day: int, sample: bool = False) -> Iterator[mmap.mmap]:
+    """Memory-map an input file for reading."""
+    with open(input_path(day, sample), "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+
+
+def read_digit_grid(day: int, sample: bool = False) -> Tuple[array, int, int]:
+    """Read a grid of digits as a flat row-major array, returning the array, width and height."""
+    with map_input(day, sample) as m:
+        chars = np.frombuffer(m, dtype=np.uint8)
+        cells = array("B", (chars[chars >= ord("0")] - ord("0")).tobytes())
+        del chars  # the map cannot close while an array views it
+        end = m.find(b"\n")
+        width = len(m[:end].rstrip(b"\r")) if end >= 0 else len(cells)
+    return cells, width, len(cells) // width
+
+
+def parse_ints(chars: np.ndarray) -> np.ndarray:
+    """Parse every run of digits in an array of characters as an integer, with any minus sign before it."""
+    digit = (chars >= ord("0")) & (chars <= ord("9"))
+    starts = np.flatnonzero(digit & ~np.concatenate(([False], digit[:-1])))
+    ends = np.flatnonzero(digit & ~np.concatenate((digit[1:], [False])))
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    positions = np.flatnonzero(digit)
+    lengths = ends - starts + 1
+    if lengths.max() > 18:
+        raise ValueError("integers of more than 18 digits may not fit in int64")
+    # Weight each digit by its place in its integer, then sum the digits of each integer
+    places = np.repeat(ends, lengths) - positions
+    values = (chars[positions] - ord("0")).astype(np.int64) * 10**places
+    ints = np.add.reduceat(values, np.cumsum(lengths) - lengths)
+    negative = (starts > 0) & (chars[np.maximum(starts - 1, 0)] == ord("-"))
+    ints[negative] *= -1
+    return ints
+
+
+def read_ints(day: int, sample: bool = False) -> array:
+    """Read a line of comma-separated integers as an array."""
+    with map_input(day, sample) as m:
+        chars = np.frombuffer(m, dtype=np.uint8)
+        ints = parse_ints(chars)
+        del chars  # the map cannot close while an array views it
+    return array("q", ints.tobytes())
+
+
+# Lines of bits are packed in blocks of this many, to bound the unpacked bits held at once
+BIT_BLOCK = 1 << 16
+
+
+def read_bit_matrix(day: int, sample: bool = False) -> Tuple[np.ndarray, int]:
+    """
+    Read lines of bits as a matrix of packed bytes, returning the matrix and bit width.
+
+    Each line is one row, packed most significant bit first, and its last byte
+    is padded with 0s.
+    """
+    with map_input(day, sample) as m:
+        chars = np.frombuffer(m, dtype=np.uint8)
+        # Each line takes its bits, then a newline perhaps after a carriage return
+        stride = m.find(b"\n") + 1 or len(chars) + 1
+        width = len(m[: stride - 1].rstrip(b"\r"))
+        # The last line may have no newline
+        lines = (len(chars) + stride - width) // stride
+        rows = np.lib.stride_tricks.as_strided(
+            chars, (lines, width), (stride, 1), writeable=False
+        )
+        packed = np.empty((lines, (width + 7) // 8), dtype=np.uint8)
+        for start in range(0, lines, BIT_BLOCK):
+            block = rows[start : start + BIT_BLOCK] == ord("1")
+            packed[start : start + BIT_BLOCK] = np.packbits(block, axis=1)
+        del chars, rows  # the map cannot close while an array views it
+    return packed, width
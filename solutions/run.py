@@ -0,0 +1,94 @@
+"""Run the solutions for many days in parallel.
+
+Usage: python run.py [--sample] [--workers N] [DAY ...]
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib import import_module
+from importlib.util import find_spec
+from pathlib import Path
+import re
+import sys
+import time
+from typing import Any, List, Tuple
+
+SOLUTIONS_DIR = Path(__file__).parent
+PARTS = (1, 2)
+
+
+def discover_days() -> List[int]:
+    """Find the days which have a solution module."""
+    days = []
+    for path in SOLUTIONS_DIR.glob("day*.py"):
+        match = re.fullmatch(r"day(\d+)\.py", path.name)
+        if match:
+            days.append(int(match.group(1)))
+    return sorted(days)
+
+
+def run_part(day: int, part: int, sample: bool) -> Tuple[List[Tuple[int, Any]], float]:
+    """
+    Solve one part of a day, returning the parts solved with their answers, and the time taken.
+
+    A day whose parts share their work defines solve_parts, which solves both
+    at once. Its part 1 job solves both parts, and its part 2 job solves none.
+    """
+    module: Any = import_module(f"day{day}")
+    start = time.perf_counter()
+    if not hasattr(module, "solve_parts"):
+        answers = [(part, module.solve(part, sample=sample))]
+    elif part == PARTS[0]:
+        answers = list(zip(PARTS, module.solve_parts(sample=sample)))
+    else:
+        answers = []
+    return answers, time.perf_counter() - start
+
+
+def format_answer(answer: Any) -> str:
+    """Format an answer, starting multi-line answers on their own line."""
+    text = str(answer)
+    return f"\n{text}" if "\n" in text else text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("days", nargs="*", type=int, help="days to run (default: all)")
+    parser.add_argument("--sample", action="store_true", help="use the sample inputs")
+    parser.add_argument("--workers", type=int, help="number of worker processes")
+    args = parser.parse_args()
+
+    days = args.days or discover_days()
+    start = time.perf_counter()
+    # Modules are only imported by the workers, where any error is caught
+    missing = [day for day in days if find_spec(f"day{day}") is None]
+    for day in missing:
+        print(f"day{day} failed: no solution module")
+    failed = len(missing) > 0
+    days = [day for day in days if day not in missing]
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # Later days tend to be the slowest, so submit them first
+        futures = {
+            executor.submit(run_part, day, part, args.sample): (day, part)
+            for day in sorted(days, reverse=True)
+            for part in PARTS
+        }
+        for future in as_completed(futures):
+            day, part = futures[future]
+            try:
+                answers, elapsed = future.result()
+            except Exception as error:
+                failed = True
+                print(f"day{day} part{part} failed: {error!r}")
+                continue
+            shared = " for both parts" if len(answers) > 1 else ""
+            for solved, answer in answers:
+                print(
+                    f"day{day} part{solved} ({elapsed:.3f}s{shared}): {format_answer(answer)}"
+                )
+    print(f"total ({time.perf_counter() - start:.3f}s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())